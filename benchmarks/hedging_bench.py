@@ -0,0 +1,92 @@
+"""Compare tail latency with and without hedging against stub backends.
+
+    python benchmarks/hedging_bench.py --requests 400 --budget 0.15
+
+The primary stub is usually fast but stalls on a fraction of requests; the
+fallback stub is slower on average but never stalls.
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.hedging import HedgedModel
+
+
+class StubBackend:
+    def __init__(self, first_token: float, stall_rate: float, stall: float, tokens: int = 20, per_token: float = 0.002):
+        self.first_token = first_token
+        self.stall_rate = stall_rate
+        self.stall = stall
+        self.tokens = tokens
+        self.per_token = per_token
+
+    async def astream(self, prompt: str):
+        delay = random.expovariate(1 / self.first_token)
+        if random.random() < self.stall_rate:
+            delay += self.stall
+        await asyncio.sleep(delay)
+        for i in range(self.tokens):
+            yield f"tok{i} "
+            await asyncio.sleep(self.per_token)
+
+
+def percentile(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(p * len(samples)))]
+
+
+async def run(model, requests: int, concurrency: int):
+    latencies = []
+    gate = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with gate:
+            started = time.monotonic()
+            async for _ in model.astream("prompt"):
+                pass
+            latencies.append(time.monotonic() - started)
+
+    started = time.monotonic()
+    await asyncio.gather(*[one() for _ in range(requests)])
+    return latencies, time.monotonic() - started
+
+
+def report(name, latencies, elapsed):
+    print(f"{name:<10} p50={percentile(latencies, 0.5) * 1000:7.1f}ms "
+          f"p95={percentile(latencies, 0.95) * 1000:7.1f}ms "
+          f"p99={percentile(latencies, 0.99) * 1000:7.1f}ms "
+          f"throughput={len(latencies) / elapsed:7.1f} req/s")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--budget", type=float, default=0.15)
+    parser.add_argument("--stall-rate", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    primary = StubBackend(first_token=0.05, stall_rate=args.stall_rate, stall=2.0)
+    fallback = StubBackend(first_token=0.10, stall_rate=0.0, stall=0.0)
+
+    latencies, elapsed = await run(primary, args.requests, args.concurrency)
+    report("primary", latencies, elapsed)
+
+    hedged = HedgedModel(primary, fallback, first_token_budget=args.budget)
+    latencies, elapsed = await run(hedged, args.requests, args.concurrency)
+    report("hedged", latencies, elapsed)
+
+    stats = hedged.snapshot()
+    print(f"hedge_rate={stats['hedge_rate']:.3f} primary_wins={stats['primary_wins']} "
+          f"fallback_wins={stats['fallback_wins']} breaker={stats['primary_breaker']}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
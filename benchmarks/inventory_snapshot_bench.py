@@ -0,0 +1,111 @@
+"""Compare per-worker load time and memory: JSON parsed per worker vs a shared mmap snapshot.
+
+    python benchmarks/inventory_snapshot_bench.py --vehicles 200000 --workers 8
+
+Each worker loads the inventory, runs a lookup over every group and reports
+its load time, RSS and PSS (proportional set size, which splits shared pages
+between the processes mapping them).
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.inventory import CarInventory
+from models.inventory_snapshot import write_snapshot
+
+VEHICLE_TYPES = ["sedan", "suv", "truck", "van", "coupe"]
+BUDGET_CATEGORIES = ["economy", "luxury"]
+MAKES = ["Toyota", "Honda", "Ford", "BMW", "Lexus", "Chevrolet", "Hyundai", "Kia"]
+
+
+def synthetic_inventory(count: int, seed: int = 1):
+    rng = random.Random(seed)
+    inventory = {t: {c: [] for c in BUDGET_CATEGORIES} for t in VEHICLE_TYPES}
+    for i in range(count):
+        category = rng.choice(BUDGET_CATEGORIES)
+        price = rng.randint(18000, 35000) if category == "economy" else rng.randint(35001, 90000)
+        inventory[rng.choice(VEHICLE_TYPES)][category].append({
+            "name": f"{rng.choice(MAKES)} Model {i}",
+            "price": price,
+            "lease": price // 80,
+            "features": rng.sample(["Bluetooth", "Backup Camera", "Sunroof", "Navigation", "Leather Seats",
+                                    "Apple CarPlay", "All-Wheel Drive", "Lane Assist"], 3),
+            "deals": rng.sample(["0% APR for 60 months", "$1500 cash back", "Free maintenance for 2 years",
+                                 "First 3 payments waived", "Lease loyalty bonus"], 2)
+        })
+    return inventory
+
+
+def memory_kb():
+    stats = {}
+    for path, keys in (("/proc/self/status", ("VmRSS",)), ("/proc/self/smaps_rollup", ("Pss",))):
+        try:
+            with open(path) as f:
+                for line in f:
+                    key = line.split(":")[0]
+                    if key in keys:
+                        stats[key] = int(line.split()[1])
+        except OSError:
+            pass
+    return stats
+
+
+def worker(mode, path, results):
+    started = time.perf_counter()
+    if mode == "json":
+        with open(path, encoding="utf-8") as f:
+            inventory = CarInventory(json.load(f))
+    else:
+        inventory = CarInventory(snapshot_path=path)
+    load_seconds = time.perf_counter() - started
+
+    # Touch every group the way request handling would
+    matches = sum(len(inventory.get_vehicles(t, c)) for t in VEHICLE_TYPES for c in BUDGET_CATEGORIES)
+    results.put({"load_seconds": load_seconds, "matches": matches, **memory_kb()})
+
+
+def run(mode, path, workers):
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=worker, args=(mode, path, results)) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    samples = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--vehicles", type=int, default=200000)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    multiprocessing.set_start_method("spawn")
+    inventory = synthetic_inventory(args.vehicles)
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, "inventory.json")
+        snapshot_path = os.path.join(tmp, "inventory.snap")
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(inventory, f)
+        write_snapshot(inventory, snapshot_path)
+        print(f"{args.vehicles} vehicles: json={os.path.getsize(json_path) / 1e6:.1f}MB "
+              f"snapshot={os.path.getsize(snapshot_path) / 1e6:.1f}MB, {args.workers} workers")
+
+        for mode, path in (("json", json_path), ("snapshot", snapshot_path)):
+            samples = run(mode, path, args.workers)
+            load = sum(s["load_seconds"] for s in samples) / len(samples)
+            rss = sum(s.get("VmRSS", 0) for s in samples) / 1024
+            pss = sum(s.get("Pss", 0) for s in samples) / 1024
+            print(f"{mode:<9} load={load * 1000:8.1f}ms/worker  total RSS={rss:8.1f}MB  total PSS={pss:8.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
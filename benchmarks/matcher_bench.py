@@ -0,0 +1,86 @@
+"""Compare the compiled intent matcher with the substring checks it replaced.
+
+    python benchmarks/matcher_bench.py --messages 100000
+
+Reports throughput on a synthetic mix of customer messages, and how many
+messages each approach resolves to the expected intent and vehicle type on
+a labelled set of synonyms and typos (a miss means the bot re-asks).
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.matcher import IntentMatcher
+
+# (message, expected intent, expected vehicle type)
+LABELLED = [
+    ("I want to buy a car", "buy", None),
+    ("We're thinking about leasing", "lease", None),
+    ("Looking to lese something", "lease", None),
+    ("I'd like to purchase", "buy", None),
+    ("financing if possible", "buy", None),
+    ("a sedan please", None, "sedan"),
+    ("a pickup", None, "truck"),
+    ("a pick up truck", None, "truck"),
+    ("maybe a crossover", None, "suv"),
+    ("minivan for the family", None, "van"),
+    ("SUV", None, "suv"),
+    ("a sedna", None, "sedan"),
+    ("a truk for work", None, "truck"),
+    ("something with an advantage on mileage", None, None),
+    ("I'd like to lease a crossover under 30k", "lease", "suv"),
+    ("a 4 door would do", None, "sedan"),
+    ("that price struck me as high", None, None),
+    ("you guys were helpful", None, None),
+]
+
+FILLER = ["hi", "there", "we", "are", "looking", "for", "something", "reliable", "with", "good", "mileage",
+          "and", "maybe", "a", "sunroof", "around", "$35,000", "for", "my", "family", "of", "four"]
+
+
+def substring_match(message: str):
+    """The checks ConversationManager.process_state used to run."""
+    intent = None
+    if "buy" in message.lower() or "lease" in message.lower():
+        intent = "buy" if "buy" in message.lower() else "lease"
+    vehicle_type = next((vtype for vtype in ["sedan", "suv", "truck", "van"] if vtype in message.lower()), None)
+    return intent, vehicle_type
+
+
+def corpus(count: int, seed: int = 1):
+    rng = random.Random(seed)
+    messages = []
+    for _ in range(count):
+        words = rng.sample(FILLER, rng.randint(4, 14))
+        words.insert(rng.randint(0, len(words)), rng.choice(LABELLED)[0])
+        messages.append(" ".join(words))
+    return messages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=100000)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    matcher = IntentMatcher()
+    print(f"compile: {(time.perf_counter() - started) * 1000:.2f}ms")
+
+    compiled = lambda m: (lambda r: (r.intent, r.vehicle_type))(matcher.match(m))
+    messages = corpus(args.messages)
+    for name, fn in (("substring", substring_match), ("compiled", compiled)):
+        started = time.perf_counter()
+        for message in messages:
+            fn(message)
+        elapsed = time.perf_counter() - started
+        correct = sum(fn(message) == (intent, vehicle_type) for message, intent, vehicle_type in LABELLED)
+        print(f"{name:<10} {len(messages) / elapsed:>10.0f} msg/s  {elapsed / len(messages) * 1e6:6.2f} us/msg  "
+              f"labelled {correct}/{len(LABELLED)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Compare request parsing and response encoding for /api payloads.
+
+    python benchmarks/serialization_bench.py --vehicles 0 10 50 --iterations 20000
+
+Payloads mimic real turns: conversation data with collected user info and a
+vehicle list of the given length. Request rows time parsing the raw body
+(stdlib json + dict lookups vs Pydantic's validating parser); response rows
+time encoding a reply (stdlib json vs orjson vs a Pydantic model dump). The
+gzip column is the compressed size of the response body.
+"""
+import os
+import sys
+import gzip
+import json
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    from models.api import ChatRequest, ChatResponse
+except ImportError:
+    ChatRequest = ChatResponse = None
+
+MAKES = ["Toyota", "Honda", "Ford", "BMW", "Lexus", "Chevrolet", "Hyundai", "Kia"]
+FEATURES = ["Bluetooth", "Backup Camera", "Sunroof", "Navigation", "Leather Seats",
+            "Apple CarPlay", "All-Wheel Drive", "Lane Assist"]
+DEALS = ["0% APR for 60 months", "$1500 cash back", "Free maintenance for 2 years", "No payments for 90 days"]
+
+
+def vehicles(count: int, seed: int = 1):
+    rng = random.Random(seed)
+    result = []
+    for i in range(count):
+        price = rng.randint(18000, 90000)
+        result.append({
+            "name": f"{rng.choice(MAKES)} Model {i}",
+            "price": price,
+            "lease": price // 80,
+            "features": rng.sample(FEATURES, 3),
+            "deals": rng.sample(DEALS, 2)
+        })
+    return result
+
+
+def payloads(count: int):
+    data = {
+        "state": "show_options",
+        "user_info": {"purchase_type": "buy", "vehicle_type": "suv", "budget": "luxury"},
+        "vehicles": vehicles(count),
+        "session_id": "3f9c2a0e4b7d4c1e9a8b6d5c4e3f2a1b",
+        "turn": 4
+    }
+    request = json.dumps({"message": "Tell me more about the second one, does it come with AWD?",
+                          "conversation_data": data}).encode()
+    response = {**data, "content": "Here are some options that match your preferences. " * 4,
+                "last_response": "get_budget", "turn": 5}
+    return request, response
+
+
+def timed(fn, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def stdlib_parse(body: bytes):
+    data = json.loads(body)
+    return data.get("message", ""), data.get("conversation_data", {})
+
+
+def pydantic_parse(body: bytes):
+    request = ChatRequest.model_validate_json(body)
+    return request.message, request.data()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vehicles", type=int, nargs="+", default=[0, 10, 50])
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    if orjson is None:
+        print("orjson not installed; skipping orjson rows")
+    if ChatRequest is None:
+        print("pydantic/fastapi not installed; skipping pydantic rows")
+
+    print(f"{'vehicles':>8}  {'case':<26}{'us/op':>10}{'bytes':>9}{'gzip':>8}")
+    for count in args.vehicles:
+        body, response = payloads(count)
+        cases = [("request  json.loads", lambda: stdlib_parse(body), len(body), None)]
+        if ChatRequest is not None:
+            cases.append(("request  pydantic", lambda: pydantic_parse(body), len(body), None))
+
+        encoded = json.dumps(response).encode()
+        cases.append(("response json.dumps", lambda: json.dumps(response).encode(), len(encoded), encoded))
+        if orjson is not None:
+            fast = orjson.dumps(response)
+            cases.append(("response orjson", lambda: orjson.dumps(response), len(fast), fast))
+        if ChatResponse is not None:
+            model = ChatResponse.model_validate(response)
+            dumped = model.model_dump_json().encode()
+            cases.append(("response pydantic", lambda: model.model_dump_json(), len(dumped), dumped))
+            cases.append(("response validate+dump", lambda: ChatResponse.model_validate(response).model_dump_json(),
+                          len(dumped), dumped))
+
+        for name, fn, size, payload in cases:
+            compressed = len(gzip.compress(payload)) if payload is not None else None
+            print(f"{count:>8}  {name:<26}{timed(fn, args.iterations):>10.2f}{size:>9}"
+                  f"{compressed if compressed is not None else '':>8}")
+
+
+if __name__ == "__main__":
+    main()
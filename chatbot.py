@@ -3,9 +3,33 @@ import json
 from dataclasses import dataclass, asdict
 from typing import Optional, Dict
 import os 
+import time
+import uuid
+import logging
+from functools import lru_cache
+from config import ModelSpec, create_model_registry, create_recorder, create_store, create_prefetcher, setup_logging
+from utils.recorder import current_trace
+from utils.log_pipeline import bind_correlation
+from utils.json_stream import IncrementalJSONParser, dataclass_json_schema, repair_json, record_parse
+from services.prefetch import InventoryPrefetcher
 
 load_dotenv = ()
 
+logger = logging.getLogger("car_dealership_chatbot.sales_bot")
+# Full model output is high-volume; this logger is sampled (see config.LOG_SAMPLE_RATES)
+raw_output_logger = logging.getLogger("car_dealership_chatbot.llm.raw")
+
+# The sales bot keeps GPT-4 for replies; extraction and summaries follow the
+# shared registry defaults in config.py.
+CHATBOT_MODELS = {
+    "reply": ModelSpec("openai", "gpt-4", temperature=1.0, max_tokens=3800, max_concurrency=4, cost_per_1k_tokens=0.06),
+}
+
+@lru_cache(maxsize=None)
+def create_chatbot_registry():
+    # Bots are created per message; one registry keeps per-task limits and stats process-wide
+    return create_model_registry(CHATBOT_MODELS)
+
 @dataclass
 class CustomerInfo:
     # Personal Information
@@ -47,15 +71,25 @@ class CustomerInfo:
     max_budget: Optional[str] = None
 
 
+# Structured-output schema passed to the extraction model
+CUSTOMER_INFO_SCHEMA = dataclass_json_schema(CustomerInfo)
+
 class CarSalesGPTBot:
-    def __init__(self, api_key, knowlage_base=None):
+    def __init__(self, api_key, knowlage_base=None, models=None, recorder=None, session_id=None, store=None,
+                 inventory=None):
         openai.api_key = api_key
         self.knowlage_base = knowlage_base
+        self.models = models or create_chatbot_registry()
+        self.recorder = recorder or create_recorder()
+        self.session_id = session_id or uuid.uuid4().hex
         self.customer = CustomerInfo()
         self.conversation_history = []
         self.current_collection_phase = "personal_info"
         self.all_information_collected = False
-        self.conversation_file = None
+        # Transcripts and leads are persisted write-behind; nothing here waits on disk
+        self.store = store or create_store()
+        # Candidate vehicles are narrowed in the background as fields are filled
+        self.prefetcher = InventoryPrefetcher(inventory) if inventory else create_prefetcher()
         self.required_fields = {
             'personal_info': ['first_name', 'last_name', 'email', 'phone', 'zip'],
             'budget': ['min_budget', 'max_budget', 'credit_rating'],
@@ -117,10 +151,11 @@ class CarSalesGPTBot:
             next_phase = self._get_next_phase()
             if next_phase:
                 self.current_collection_phase = next_phase
-                print(f"✅ Moving to next phase: {self.current_collection_phase}")
-            else:
+                logger.info(f"Moving to next phase: {self.current_collection_phase}")
+            elif not self.all_information_collected:
                 self.all_information_collected = True
-                print("✅ All phases completed successfully.")
+                logger.info("All phases completed successfully.")
+                self.store.record_lead(self.session_id, asdict(self.customer))
             return False
         
         return False
@@ -137,12 +172,23 @@ class CarSalesGPTBot:
     def process_message(self, user_message):
         """Process user message and update fields accordingly."""
         try:
-            self.conversation_history.append({"role": "user", "content": user_message})
-            extracted_info = self.extract_information(user_message)
-            self.update_customer_info(extracted_info)
-            self.update_required_fields()
-            response = self.get_bot_response()
-            self.conversation_history.append({"role": "assistant", "content": response})
+            turn = len(self.conversation_history) // 2
+            with bind_correlation(self.session_id, turn), \
+                    self.recorder.turn("sales_bot", self.session_id, turn, user_message, self.recorded_state()) as trace:
+                self.conversation_history.append({"role": "user", "content": user_message})
+                # Fields are applied as they stream in; the final call picks up
+                # anything only recovered by the repair pass.
+                with trace.stage("extract"):
+                    extracted_info = self.extract_information(user_message, on_fields=self.update_customer_info)
+                with trace.stage("update"):
+                    self.update_customer_info(extracted_info)
+                    self.update_required_fields()
+                with trace.stage("respond"):
+                    response = self.get_bot_response()
+                self.conversation_history.append({"role": "assistant", "content": response})
+                self.store.record_turn(self.session_id, turn, "user", user_message)
+                self.store.record_turn(self.session_id, turn, "assistant", response)
+                trace.finish(response, self.recorded_state())
             return response
         except Exception as e:
             error_msg = f"I apologize, but I encountered an error: {str(e)}"
@@ -153,6 +199,14 @@ class CarSalesGPTBot:
 
 
 
+    def recorded_state(self):
+        """Session state captured by the traffic recorder before and after each turn."""
+        return {
+            "customer": asdict(self.customer),
+            "phase": self.current_collection_phase,
+            "all_information_collected": self.all_information_collected
+        }
+
     def update_customer_info(self, extracted_info: Dict):
         """
         Update customer information with validated data, ensuring proper type conversion
@@ -198,12 +252,30 @@ class CarSalesGPTBot:
                 if value and (current_value is None or 
                              str(value).lower() != str(current_value).lower()) and value != "N/A":
                     setattr(self.customer, field, value)
-                    print(f"Updated {field}: {value}")
-        
+                    logger.debug(f"Updated {field}")
+
+        self.prefetcher.update(self.session_id, self.customer)
+
         # After updating, check if we can move to next phase
         self.check_phase_completion()
 
 
+    def get_recommendations(self, limit=3):
+        """Vehicles matching the collected constraints, cheapest first, with payment options."""
+        return [
+            {
+                "name": c.vehicle["name"],
+                "type": c.vehicle_type,
+                "price": c.vehicle.get("price"),
+                "features": c.vehicle.get("features", []),
+                "deals": c.vehicle.get("deals", []),
+                "monthly_finance": c.payments["finance"],
+                "finance_apr": c.payments["apr"],
+                "monthly_lease": c.payments["lease"]
+            }
+            for c in self.prefetcher.candidates(self.session_id, self.customer)[:limit]
+        ]
+
     def get_bot_response(self):
         """Generate the bot's response with improved flow maintenance."""
         missing_fields = self.get_missing_fields()
@@ -252,6 +324,14 @@ class CarSalesGPTBot:
             'current_phase': self.current_collection_phase
         }
 
+        phases = list(self.required_fields)
+        matching_vehicles = ""
+        if phases.index(self.current_collection_phase) >= phases.index('car_details'):
+            matching_vehicles = f"""
+        Matching vehicles in stock (suggest these when relevant, with their payment options):
+        {json.dumps(self.get_recommendations(), indent=2)}
+        """
+
         system_prompt = f"""
         You are a professional car sales assistant helping a customer find their ideal car. Your goal is to collect all necessary information efficiently while maintaining a professional conversation flow. if user wants any information about the company provide information from the `knowlage_base`  file. for collecting information follow the `collected_info`and ask question to all collect information one by one. provide answer in proper dropdown and markdown format.
 
@@ -263,6 +343,7 @@ class CarSalesGPTBot:
 
         Already collected information:
         {json.dumps(collected_info, indent=2)}
+        {matching_vehicles}
 
         **Rules for Interaction**:
         1. Ask specifically for the next missing field: {next_field}
@@ -306,20 +387,23 @@ class CarSalesGPTBot:
         8. End with a clear, focused question about the next required field
         """
 
-        response = openai.ChatCompletion.create(
-            model="gpt-4",
-            temperature=1.0,
-            top_p=0.9,
-            max_tokens=3800,
-            messages=[{"role": "system", "content": system_prompt},
-                    *self.conversation_history]
-        )
-        return response.choices[0].message.content
+        started = time.perf_counter()
+        response = self.models.complete("reply", [{"role": "system", "content": system_prompt},
+                                                  *self.conversation_history])
+        trace = current_trace()
+        if trace:
+            trace.model_call("reply", system_prompt, response, time.perf_counter() - started)
+        return response
+
 
 
+    def extract_information(self, text, on_fields=None):
+        """Extract relevant information from customer message with improved validation.
 
-    def extract_information(self, text):
-        """Extract relevant information from customer message with improved validation."""
+        The extraction model runs in structured-output mode and its JSON is parsed
+        incrementally; `on_fields` is called with each batch of validated fields
+        as soon as they are complete.
+        """
         try:
             name_context = ""
             if self.customer.first_name or self.customer.last_name:
@@ -411,77 +495,97 @@ class CarSalesGPTBot:
 
             Message: {text}
 
-            Return a JSON object with only the newly extracted or updated information.
+            Return a JSON object with only the newly extracted or updated information; use null for every other field.
             """
             
-            # Perform extraction through GPT-3
-            response = openai.ChatCompletion.create(
-                model="gpt-4",
-                temperature=0.7,
-                top_p=0.9,
-                max_tokens=4000,
-                messages=[{"role": "system", "content": "You are a precise data extraction assistant. Understand the user input and Extract only the specified information and return it as JSON."},
-                        {"role": "user", "content": extraction_prompt}]
-            )
-
-            response_content = response.choices[0].message.content.strip()
-            print(f"Raw response content: {response_content}")  
-            
-            # Treat the response content as a string first
-            response_content_str = response_content.replace("```json", "").replace("```", "").strip()
-            
-            # Attempt to parse the string as JSON
-            try:
-                extracted_info = json.loads(response_content_str)
-            except json.JSONDecodeError:
-                # If parsing fails, treat the entire content as a string and wrap it in a JSON object
-                extracted_info = {"raw_response": response_content_str}
-
-            # Handle trade-in response (ensure normalization)
-            if "has_trade_in" in extracted_info:
-                trade_in_value = extracted_info["has_trade_in"]
-                if isinstance(trade_in_value, str):
-                    # Normalize responses to True/False
-                    if any(word in trade_in_value.lower() for word in ["yes", "have", "available", "trade-in"]):
-                        extracted_info["has_trade_in"] = True
-                    elif any(word in trade_in_value.lower() for word in ["no", "don't", "none", "not"]):
-                        extracted_info["has_trade_in"] = False
-                    else:
-                        extracted_info.pop("has_trade_in")
-                elif not isinstance(trade_in_value, bool):
-                    extracted_info.pop("has_trade_in")
-
-            
-            # Validate zip code if present
-            if "zip" in extracted_info:
-                zip_code = str(extracted_info["zip"])
-                if not (len(zip_code) == 5 and zip_code.isdigit()):
-                    extracted_info.pop("zip")
-
-            # Validate year if present
-            if "year" in extracted_info:
-                year = str(extracted_info["year"])
-                if not (year.isdigit() and 1900 <= int(year) <= 2025):
-                    extracted_info.pop("year")
-
-            # Ensure budget values are numeric
-            for budget_field in ["min_budget", "max_budget"]:
-                if budget_field in extracted_info:
-                    try:
-                        extracted_info[budget_field] = float(str(extracted_info[budget_field]).replace("k", "000"))
-                    except (ValueError, TypeError):
-                        extracted_info.pop(budget_field)
+            # Perform extraction on the small extraction model
+            parser = IncrementalJSONParser()
+            extracted_info = {}
+            chunks = []
+            started = time.perf_counter()
+            for chunk in self.models.stream("extraction", [
+                {"role": "system", "content": "You are a precise data extraction assistant. Understand the user input and Extract only the specified information and return it as JSON."},
+                {"role": "user", "content": extraction_prompt}
+            ], json_schema=CUSTOMER_INFO_SCHEMA):
+                chunks.append(chunk)
+                fields = self._validate_extracted(parser.feed(chunk))
+                if fields:
+                    extracted_info.update(fields)
+                    if on_fields:
+                        on_fields(fields)
+
+            response_content = "".join(chunks).strip()
+            raw_output_logger.info(f"Raw extraction output: {response_content}")
+            trace = current_trace()
+            if trace:
+                trace.model_call("extraction", extraction_prompt, response_content, time.perf_counter() - started)
+
+            if parser.complete and not parser.failed_segments:
+                record_parse("clean")
+            else:
+                # Truncated, or some fields were not valid JSON: repair the output
+                # instead of paying for another extraction call
+                repaired = repair_json(response_content)
+                recovered = self._validate_extracted(repaired) if repaired else {}
+                if recovered.keys() - extracted_info.keys():
+                    record_parse("repaired")
+                    extracted_info.update(recovered)
+                else:
+                    record_parse("partial" if extracted_info else "failed")
 
             return extracted_info
 
         except json.JSONDecodeError as e:
-            print(f"JSON Decode Error: {e}")
+            logger.warning(f"JSON Decode Error: {e}")
             return {}
         except Exception as e:
-            print(f"Warning: Information extraction failed: {e}")
+            logger.warning(f"Information extraction failed: {e}", exc_info=True)
             return {}
 
 
+    @staticmethod
+    def _validate_extracted(extracted_info: Dict) -> Dict:
+        """Normalize extracted fields and drop the ones that fail validation."""
+        # Structured output reports every field; null means nothing was extracted
+        extracted_info = {k: v for k, v in extracted_info.items() if v is not None}
+
+        # Handle trade-in response (ensure normalization)
+        if "has_trade_in" in extracted_info:
+            trade_in_value = extracted_info["has_trade_in"]
+            if isinstance(trade_in_value, str):
+                # Normalize responses to True/False
+                if any(word in trade_in_value.lower() for word in ["yes", "have", "available", "trade-in"]):
+                    extracted_info["has_trade_in"] = True
+                elif any(word in trade_in_value.lower() for word in ["no", "don't", "none", "not"]):
+                    extracted_info["has_trade_in"] = False
+                else:
+                    extracted_info.pop("has_trade_in")
+            elif not isinstance(trade_in_value, bool):
+                extracted_info.pop("has_trade_in")
+
+        # Validate zip code if present
+        if "zip" in extracted_info:
+            zip_code = str(extracted_info["zip"])
+            if not (len(zip_code) == 5 and zip_code.isdigit()):
+                extracted_info.pop("zip")
+
+        # Validate year if present
+        if "year" in extracted_info:
+            year = str(extracted_info["year"])
+            if not (year.isdigit() and 1900 <= int(year) <= 2025):
+                extracted_info.pop("year")
+
+        # Ensure budget values are numeric
+        for budget_field in ["min_budget", "max_budget"]:
+            if budget_field in extracted_info:
+                try:
+                    extracted_info[budget_field] = float(str(extracted_info[budget_field]).replace("k", "000"))
+                except (ValueError, TypeError):
+                    extracted_info.pop(budget_field)
+
+        return extracted_info
+
+
     def generate_summary(self):
         """Generate a comprehensive summary of the conversation and customer requirements for dealership.""" 
         try:
@@ -533,19 +637,10 @@ class CarSalesGPTBot:
             **Now, generate the summary based on the provided data**:
             """
 
-            response = openai.ChatCompletion.create(
-                model="gpt-4",
-                temperature=0.7,
-                top_p=0.9,
-                max_tokens=1000,
-                messages=[
-                    {"role": "system", "content": "You are a professional car sales assistant. Create a concise and actionable summary of the customer interaction."},
-                    {"role": "user", "content": summary_prompt}
-                ]
-            )
-
-            # Extract the summary text from the response
-            summary = response.choices[0].message.content
+            summary = self.models.complete("summary", [
+                {"role": "system", "content": "You are a professional car sales assistant. Create a concise and actionable summary of the customer interaction."},
+                {"role": "user", "content": summary_prompt}
+            ])
             return summary  # Return plain text, not a dictionary
 
         except Exception as e:
@@ -555,12 +650,10 @@ class CarSalesGPTBot:
 
 
     def generate_summary_to_file(self):
-        """Generate a summary and save it to a separate text file.""" 
+        """Generate a summary and persist it with the lead through the write-behind store.""" 
         try:
             summary = self.generate_summary()
-            # summary_file = f"conversation_summary_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
-            # with open(summary_file, 'w', encoding='utf-8') as f:
-            #     f.write(summary)
+            self.store.record_lead(self.session_id, asdict(self.customer), summary)
             return summary
         except Exception as e:
             return f"Error generating summary text file: {str(e)}"
@@ -577,20 +670,18 @@ class CarSalesGPTBot:
             """
             return summary
         else:
-            summary = self.generate_summary()
+            summary = self.generate_summary_to_file()
 
-        self.generate_summary_to_file()
-        return """Thank you for your time. Here's a summary of our conversation:\n\n{summary}\n\nSummary file saved to 
-        {summary_file}\n\nGoodbye!"""
+        return f"""Thank you for your time. Here's a summary of our conversation:\n\n{summary}\n\nGoodbye!"""
     
 
-def generate_customer_data(user_message, api_key=None, conversation_history=None, knowlage_base=None):
+def generate_customer_data(user_message, api_key=None, conversation_history=None, knowlage_base=None, session_id=None):
     # Use default API key if none provided
     if not api_key:
         api_key = "Api-Key"  # Replace
 
     # Initialize bot
-    bot = CarSalesGPTBot(api_key, knowlage_base)
+    bot = CarSalesGPTBot(api_key, knowlage_base, session_id=session_id)
  
     # Load previous conversation history if provided
     if conversation_history:
@@ -666,7 +757,10 @@ def generate_conversation_summary(conversation_data=None, api_key=None):
 
 
 if __name__ == "__main__":
+    setup_logging()
     conversation_history = []
+    # One session for the whole console conversation, so prefetched candidates carry over
+    session_id = uuid.uuid4().hex
     while True:
         try:
             user_input = input('You: ').strip()
@@ -686,7 +780,8 @@ if __name__ == "__main__":
                 continue
                 
             # Process message and store in history
-            data = generate_customer_data(user_message=user_input, conversation_history=conversation_history)
+            data = generate_customer_data(user_message=user_input, conversation_history=conversation_history,
+                                          session_id=session_id)
             conversation_history.append({"role": "user", "content": user_input})
             if 'response' in data:
                 conversation_history.append({"role": "assistant", "content": data['response']})
@@ -1,15 +1,50 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
+import os
+import atexit
 import logging
-from langchain_ollama import OllamaLLM
+from functools import lru_cache
+from dataclasses import dataclass, replace
+from services.admission import AdmissionController
+from services.hedging import HedgedModel, CircuitBreaker
+from services.model_registry import ModelRegistry
+from services.persistence import WriteBehindStore
+from services.reply_policy import ReplyPolicy
+from services.tenants import TenantConfig, TenantRegistry
+from services.prefetch import InventoryPrefetcher
+from models.inventory import CarInventory
+from utils.recorder import TurnRecorder
+from utils.log_pipeline import start_pipeline
 
+# Seconds without any frame (including heartbeats) before a WebSocket is closed
+WS_IDLE_TIMEOUT_SECONDS = float(os.getenv("WS_IDLE_TIMEOUT_SECONDS", "60"))
+
+# Reverse proxies whose X-Forwarded-For is trusted for per-client rate limiting
+# (comma-separated peer addresses); clients connecting directly cannot set their identity
+TRUSTED_PROXIES = frozenset(p.strip() for p in os.getenv("TRUSTED_PROXIES", "").split(",") if p.strip())
+
+# Columnar inventory snapshot shared read-only by every worker on the host
+# (build with `python -m models.inventory_snapshot build <path>`)
+INVENTORY_SNAPSHOT = os.getenv("INVENTORY_SNAPSHOT")
+
+# Noisy trace loggers and the fraction of their records that is kept
+LOG_SAMPLE_RATES = {
+    "car_dealership_chatbot.llm.raw": float(os.getenv("LOG_SAMPLE_RAW_OUTPUT", "0.05")),
+}
+
+@lru_cache(maxsize=None)
 def setup_logging():
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    listener = start_pipeline(
+        level=getattr(logging, os.getenv("LOG_LEVEL", "INFO").upper()),
+        queue_size=int(os.getenv("LOG_QUEUE_SIZE", "10000")),
+        level_rates={"DEBUG": float(os.getenv("LOG_SAMPLE_DEBUG", "0.01"))},
+        logger_rates=LOG_SAMPLE_RATES
     )
+    # Drain whatever is still queued on shutdown
+    atexit.register(listener.stop)
     return logging.getLogger("car_dealership_chatbot")
 
 def create_app():
@@ -22,16 +57,133 @@ def create_app():
         allow_methods=["*"],
         allow_headers=["*"],
     )
+    # Replies carrying vehicle lists compress well; small turns are sent as-is
+    app.add_middleware(GZipMiddleware, minimum_size=1024)
     
     app.mount("/static", StaticFiles(directory="static"), name="static")
     
     return app
 
-def create_ai_model():
-    return OllamaLLM(
-        model="llama3",
-        temperature=0.7,
-        max_tokens=1024
+@lru_cache(maxsize=None)
+def create_inventory():
+    # One inventory per process, read from the shared snapshot when configured
+    return CarInventory(snapshot_path=INVENTORY_SNAPSHOT)
+
+@lru_cache(maxsize=None)
+def create_prefetcher():
+    # Sales bots are created per message; candidates are cached per session here
+    return InventoryPrefetcher(create_inventory(), max_sessions=int(os.getenv("PREFETCH_MAX_SESSIONS", "10000")))
+
+@lru_cache(maxsize=None)
+def create_recorder():
+    # Traffic recording is opt-in and refuses to start without RECORD_PII_SALT;
+    # one shared log per process, drained on interpreter exit
+    recorder = TurnRecorder(os.getenv("RECORD_TRAFFIC_PATH"), salt=os.getenv("RECORD_PII_SALT", ""))
+    atexit.register(recorder.close)
+    return recorder
+
+@lru_cache(maxsize=None)
+def create_store():
+    # One write-behind store per process, flushed on interpreter exit
+    store = WriteBehindStore(
+        os.getenv("PERSISTENCE_DB", "conversations.db"),
+        flush_interval=float(os.getenv("PERSISTENCE_FLUSH_INTERVAL", "1.0")),
+        batch_size=int(os.getenv("PERSISTENCE_BATCH_SIZE", "200")),
+        max_pending=int(os.getenv("PERSISTENCE_MAX_PENDING", "10000"))
+    )
+    atexit.register(store.close)
+    return store
+
+def create_reply_policy(scripted_states):
+    # REPLY_POLICY_MODE: 'direct' serves scripted replies without a model call,
+    # 'background' also grows the template pool with LLM rephrasings, 'model' always generates
+    return ReplyPolicy.for_states(scripted_states, os.getenv("REPLY_POLICY_MODE", "direct"))
+
+def create_admission_controller(max_in_flight=None, max_queue=None, max_queue_wait=None, parent=None):
+    # Tenants pass their own quotas; the ADMISSION_* settings are the defaults
+    return AdmissionController(
+        max_in_flight=max_in_flight or int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "16")),
+        max_queue=max_queue if max_queue is not None else int(os.getenv("ADMISSION_MAX_QUEUE", "32")),
+        max_queue_wait=max_queue_wait or float(os.getenv("ADMISSION_MAX_QUEUE_WAIT", "2.0")),
+        client_rate=float(os.getenv("ADMISSION_CLIENT_RATE", "1.0")),
+        client_burst=float(os.getenv("ADMISSION_CLIENT_BURST", "5")),
+        parent=parent
+    )
+
+@lru_cache(maxsize=None)
+def create_global_admission_controller():
+    # Every tenant shares one model backend; this caps in-flight calls across all
+    # of them, and each tenant's quota is taken under it
+    return create_admission_controller()
+
+@dataclass(frozen=True)
+class ModelSpec:
+    provider: str  # 'ollama' or 'openai'
+    model: str
+    temperature: float
+    max_tokens: int
+    max_concurrency: int
+    top_p: float = 0.9
+    cost_per_1k_tokens: float = 0.0
+
+# Per-task model routing. Override a task's model with MODEL_<TASK>=provider:model,
+# or disable it with an empty value (e.g. MODEL_REPLY_FALLBACK= turns off hedging).
+DEFAULT_MODELS = {
+    "extraction": ModelSpec("ollama", "qwen2.5:3b-instruct-q4_K_M", temperature=0.0, max_tokens=512, max_concurrency=8),
+    "reply": ModelSpec("ollama", "llama3", temperature=0.7, max_tokens=1024, max_concurrency=4),
+    "reply_fallback": ModelSpec("ollama", "llama3.2:1b", temperature=0.7, max_tokens=1024, max_concurrency=8),
+    "summary": ModelSpec("openai", "gpt-4", temperature=0.7, max_tokens=1000, max_concurrency=2, cost_per_1k_tokens=0.06),
+}
+
+def create_model_registry(overrides=None, settings=None):
+    specs = {**DEFAULT_MODELS, **(overrides or {})}
+    for task in list(specs):
+        value = os.getenv(f"MODEL_{task.upper()}")
+        if value is None:
+            continue
+        if not value:
+            del specs[task]
+            continue
+        provider, _, model = value.partition(":")
+        if provider not in ("ollama", "openai"):
+            provider, model = specs[task].provider, value
+        specs[task] = replace(specs[task], provider=provider, model=model)
+    # Partial per-tenant settings, e.g. {"reply": {"model": "llama3:8b"}}, take
+    # precedence over the process-wide MODEL_<TASK> environment
+    for task, fields in (settings or {}).items():
+        specs[task] = replace(specs[task], **fields) if task in specs else ModelSpec(**fields)
+    return ModelRegistry(specs)
+
+def create_tenant_registry(build):
+    limits = dict(
+        max_loaded=int(os.getenv("TENANTS_MAX_LOADED", "32")),
+        idle_ttl=float(os.getenv("TENANTS_IDLE_TTL", "900"))
+    )
+    path = os.getenv("TENANTS_CONFIG")
+    if path:
+        return TenantRegistry.from_file(path, build, **limits)
+    # Single-dealership deployment: every request goes to one tenant
+    default = TenantConfig("default", inventory_snapshot=INVENTORY_SNAPSHOT)
+    return TenantRegistry({"default": default}, build, "default", **limits)
+
+def create_ai_model(registry=None):
+    registry = registry or create_model_registry()
+    primary = registry.get("reply")
+    if "reply_fallback" not in registry:
+        return primary
+
+    return HedgedModel(
+        primary,
+        registry.get("reply_fallback"),
+        first_token_budget=float(os.getenv("LLM_FIRST_TOKEN_BUDGET", "2.0")),
+        primary_breaker=CircuitBreaker(
+            failure_threshold=int(os.getenv("LLM_BREAKER_THRESHOLD", "5")),
+            reset_timeout=float(os.getenv("LLM_BREAKER_RESET", "30"))
+        ),
+        fallback_breaker=CircuitBreaker(
+            failure_threshold=int(os.getenv("LLM_BREAKER_THRESHOLD", "5")),
+            reset_timeout=float(os.getenv("LLM_BREAKER_RESET", "30"))
+        )
     )
 
 SYSTEM_CONTEXT = '''You are an AI assistant for a car dealership. Your role is to help customers find their ideal vehicle based on their preferences and requirements.
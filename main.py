@@ -1,12 +1,23 @@
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Request, WebSocket
 from fastapi.responses import HTMLResponse, JSONResponse
 from fastapi.templating import Jinja2Templates
-import json
 import asyncio
-from config import setup_logging, create_app, create_ai_model
+from typing import Optional
+from config import (
+    setup_logging, create_app, create_ai_model, create_admission_controller, create_global_admission_controller,
+    create_model_registry, create_recorder, create_store, create_reply_policy, create_tenant_registry, SYSTEM_CONTEXT,
+    TRUSTED_PROXIES
+)
 from models.inventory import CarInventory
 from utils.conversation import ConversationManager
 from services.chat_service import ChatService
+from services.chat_session import ChatSession
+from services.admission import AdmissionRejected
+from services.tenants import Tenant, TenantConfig
+from models.api import ChatRequest, ChatResponse, FastJSONResponse, MAX_REQUEST_BYTES, validation_errors
+from pydantic import ValidationError
+from utils.log_pipeline import LOG_STATS
+from utils.json_stream import PARSE_STATS
 
 # Initialize components
 logger = setup_logging()
@@ -14,37 +25,146 @@ app = create_app()
 templates = Jinja2Templates(directory="templates")
 
 # Initialize services
-model = create_ai_model()
-inventory = CarInventory()
-conversation_manager = ConversationManager(inventory)
-chat_service = ChatService(model, conversation_manager)
+store = create_store()
+recorder = create_recorder()
+admission = create_global_admission_controller()
+
+def build_tenant(config: TenantConfig) -> Tenant:
+    # Everything a dealership owns: inventory, prompt, models, reply cache and quota
+    models = create_model_registry(settings=config.models)
+    model = create_ai_model(models)
+    conversation_manager = ConversationManager(CarInventory(snapshot_path=config.inventory_snapshot))
+    chat_service = ChatService(
+        model, conversation_manager, recorder, store,
+        create_reply_policy(ConversationManager.SCRIPTED_STATES),
+        system_context=config.system_context(SYSTEM_CONTEXT)
+    )
+    quota = create_admission_controller(config.max_concurrency, config.max_queue, config.max_queue_wait, admission)
+    return Tenant(config, chat_service, models, model, quota)
+
+tenants = create_tenant_registry(build_tenant)
+
+def client_id(request) -> str:
+    peer = request.client.host if request.client else "unknown"
+    forwarded = request.headers.get("x-forwarded-for")
+    if peer not in TRUSTED_PROXIES or not forwarded:
+        return peer
+    # Walk back through our own proxies; the first other hop is the client
+    hops = [hop.strip() for hop in forwarded.split(",") if hop.strip()]
+    for hop in reversed(hops):
+        if hop not in TRUSTED_PROXIES:
+            return hop
+    return hops[0] if hops else peer
+
+@app.on_event("shutdown")
+async def flush_store():
+    # Clean shutdown: write out every buffered transcript and lead
+    await asyncio.to_thread(store.close)
 
 @app.get("/", response_class=HTMLResponse)
 async def index(request: Request):
-    return templates.TemplateResponse("index.html", {"request": request})
+    return templates.TemplateResponse("index.html", {"request": request, "base_path": ""})
 
-@app.post("/api")
+@app.get("/t/{tenant_id}/", response_class=HTMLResponse)
+async def tenant_index(tenant_id: str, request: Request):
+    if tenant_id not in tenants.configs:
+        return HTMLResponse("Unknown dealership", status_code=404)
+    return templates.TemplateResponse("index.html", {"request": request, "base_path": f"/t/{tenant_id}"})
+
+@app.post("/api", response_model=ChatResponse)
 async def chat_endpoint(request: Request):
+    return await handle_chat(request, tenants.resolve_host(request.headers.get("host")))
+
+@app.post("/t/{tenant_id}/api", response_model=ChatResponse)
+async def tenant_chat_endpoint(tenant_id: str, request: Request):
+    return await handle_chat(request, tenant_id)
+
+async def read_body(request: Request, limit: int) -> Optional[bytes]:
+    """Read the request body, or return None as soon as it exceeds `limit` bytes."""
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > limit:
+        return None
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > limit:
+            return None
+    return bytes(body)
+
+async def handle_chat(request: Request, tenant_id: str):
+    # Responses bypass response_model validation; ChatResponse documents the shape
     try:
-        data = await request.json()
-        result = await chat_service.process_message(
-            data.get("message", ""),
-            data.get("conversation_data", {})
-        )
-        return JSONResponse(result)
-    except json.JSONDecodeError:
-        logger.error("Invalid JSON in request", exc_info=True)
-        return JSONResponse(
-            {"error": "Invalid JSON format"},
-            status_code=400
-        )
+        if tenant_id not in tenants.configs:
+            return FastJSONResponse({"error": "Unknown dealership"}, status_code=404)
+        body = await read_body(request, MAX_REQUEST_BYTES)
+        if body is None:
+            return FastJSONResponse({"error": "Request too large"}, status_code=413)
+        try:
+            payload = ChatRequest.model_validate_json(body)
+        except ValidationError as e:
+            if any(error["type"] == "json_invalid" for error in e.errors()):
+                logger.error("Invalid JSON in request")
+                return FastJSONResponse(
+                    {"error": "Invalid JSON format"},
+                    status_code=400
+                )
+            return FastJSONResponse({"error": "Invalid request", "detail": validation_errors(e)}, status_code=422)
+
+        message, conversation_data = payload.message, payload.data()
+        async with tenants.use(tenant_id) as tenant:
+            try:
+                async with tenant.admission.admit(client_id(request)):
+                    result = await tenant.chat_service.process_message(message, conversation_data)
+            except AdmissionRejected as rejected:
+                return shed_request(tenant, rejected, message, conversation_data)
+        return FastJSONResponse(result)
     except Exception as e:
         logger.error(f"API Error: {e}", exc_info=True)
-        return JSONResponse(
+        return FastJSONResponse(
             {"error": "Internal server error"},
             status_code=500
         )
 
+def shed_request(tenant: Tenant, rejected: AdmissionRejected, message: str, conversation_data: dict):
+    retry_after = {"Retry-After": str(max(1, round(rejected.retry_after)))}
+    logger.warning(f"Shedding request for tenant {tenant.config.tenant_id}: {rejected.reason}")
+    # Scripted states can still be answered without touching the model
+    degraded = tenant.chat_service.degraded_reply(message, conversation_data)
+    if degraded is not None:
+        return FastJSONResponse(degraded, headers=retry_after)
+    return FastJSONResponse(
+        {"error": "Server is busy, please retry shortly"},
+        status_code=rejected.status_code,
+        headers=retry_after
+    )
+
+@app.get("/api/stats")
+async def stats():
+    return JSONResponse({
+        "admission": admission.snapshot(),
+        "tenants": tenants.snapshot(),
+        "store": store.snapshot(),
+        "logging": LOG_STATS,
+        "extraction_parse": PARSE_STATS
+    })
+
+@app.websocket("/ws")
+async def chat_websocket(websocket: WebSocket):
+    await serve_session(websocket, tenants.resolve_host(websocket.headers.get("host")))
+
+@app.websocket("/t/{tenant_id}/ws")
+async def tenant_chat_websocket(websocket: WebSocket, tenant_id: str):
+    await serve_session(websocket, tenant_id)
+
+async def serve_session(websocket: WebSocket, tenant_id: str):
+    # The tenant stays pinned against eviction for as long as the session is open
+    async with tenants.use(tenant_id) as tenant:
+        if tenant is None:
+            await websocket.close(code=1008)
+            return
+        await websocket.accept()
+        await ChatSession(websocket, tenant.chat_service, tenant.admission, client_id(websocket)).run()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
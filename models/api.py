@@ -0,0 +1,60 @@
+import importlib.util
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
+
+# ORJSONResponse only fails at render time without orjson, so check for it up front
+if importlib.util.find_spec("orjson"):
+    from fastapi.responses import ORJSONResponse as FastJSONResponse
+else:
+    from fastapi.responses import JSONResponse as FastJSONResponse
+
+# Input limits, enforced before any state-machine or model work. Request size,
+# conversation_data included, is bounded by MAX_REQUEST_BYTES on the raw body
+# or WebSocket frame, so nothing is re-serialized to measure it.
+MAX_MESSAGE_CHARS = 2000
+MAX_REQUEST_BYTES = 64 * 1024
+MAX_VEHICLES = 50
+
+
+class ConversationData(BaseModel):
+    # Clients round-trip whatever the server sent (e.g. last_response, rephrase)
+    model_config = ConfigDict(extra="allow")
+
+    state: str = Field("greeting", max_length=64)
+    user_info: Dict[str, Any] = Field(default_factory=dict)
+    vehicles: List[Dict[str, Any]] = Field(default_factory=list, max_length=MAX_VEHICLES)
+    session_id: Optional[str] = Field(None, max_length=64)
+    turn: int = Field(0, ge=0)
+
+
+class ChatRequest(BaseModel):
+    message: str = Field("", max_length=MAX_MESSAGE_CHARS)
+    conversation_data: ConversationData = Field(default_factory=ConversationData)
+
+    def data(self) -> Dict[str, Any]:
+        """conversation_data as the plain dict ChatService works on, without unset defaults."""
+        return self.conversation_data.model_dump(exclude_unset=True, exclude_none=True)
+
+
+class SessionMessage(BaseModel):
+    """A `message` frame on the chat WebSocket; the session owns the conversation data."""
+    type: str = "message"
+    message: str = Field("", max_length=MAX_MESSAGE_CHARS)
+
+
+class ChatResponse(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+    content: str
+    state: str
+    user_info: Dict[str, Any] = Field(default_factory=dict)
+    vehicles: List[Dict[str, Any]] = Field(default_factory=list)
+    last_response: Optional[str] = None
+    session_id: Optional[str] = None
+    turn: int = 0
+    degraded: bool = False
+
+
+def validation_errors(error: ValidationError) -> List[Dict[str, Any]]:
+    """JSON-safe summary of a ValidationError (its ctx may hold exception objects)."""
+    return [{"loc": list(e["loc"]), "msg": e["msg"], "type": e["type"]} for e in error.errors()]
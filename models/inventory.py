@@ -1,62 +1,85 @@
-class CarInventory:
-    def __init__(self):
-        self.inventory = {
-            "sedan": {
-                "economy": [
-                    {
-                        "name": "Toyota Camry",
-                        "price": 25000,
-                        "lease": 300,
-                        "features": ["Bluetooth", "Backup Camera", "Lane Departure Warning"],
-                        "deals": ["0% APR for 60 months", "$1500 cash back", "Free maintenance for 2 years"]
-                    },
-                    {
-                        "name": "Honda Accord",
-                        "price": 26000,
-                        "lease": 320,
-                        "features": ["Adaptive Cruise Control", "Apple CarPlay", "Blind Spot Monitor"],
-                        "deals": ["1.9% APR for 72 months", "$2000 cash back", "No payments for 90 days"]
-                    }
-                ],
-                "luxury": [
-                    {
-                        "name": "BMW 3 Series",
-                        "price": 42000,
-                        "lease": 550,
-                        "features": ["Leather Seats", "Sunroof", "Premium Sound System"],
-                        "deals": ["2.9% APR for 36 months", "First 3 payments waived", "Complimentary maintenance package"]
-                    }
-                ]
+from typing import Any, Dict, Iterator, Optional, Tuple
+from models.inventory_snapshot import InventorySnapshot
+
+DEFAULT_INVENTORY = {
+    "sedan": {
+        "economy": [
+            {
+                "name": "Toyota Camry",
+                "price": 25000,
+                "lease": 300,
+                "features": ["Bluetooth", "Backup Camera", "Lane Departure Warning"],
+                "deals": ["0% APR for 60 months", "$1500 cash back", "Free maintenance for 2 years"]
             },
-            "suv": {
-                "economy": [
-                    {
-                        "name": "Toyota RAV4",
-                        "price": 28000,
-                        "lease": 350,
-                        "features": ["All-Wheel Drive", "Lane Assist", "Safety Sense 2.0"],
-                        "deals": ["1.9% APR for 60 months", "$2500 cash back", "Free winter tire package"]
-                    }
-                ],
-                "luxury": [
-                    {
-                        "name": "Lexus RX",
-                        "price": 50000,
-                        "lease": 600,
-                        "features": ["Premium Sound System", "Navigation", "Leather Interior"],
-                        "deals": ["1.9% APR luxury financing", "Complimentary maintenance", "Lease loyalty bonus"]
-                    }
-                ]
+            {
+                "name": "Honda Accord",
+                "price": 26000,
+                "lease": 320,
+                "features": ["Adaptive Cruise Control", "Apple CarPlay", "Blind Spot Monitor"],
+                "deals": ["1.9% APR for 72 months", "$2000 cash back", "No payments for 90 days"]
+            }
+        ],
+        "luxury": [
+            {
+                "name": "BMW 3 Series",
+                "price": 42000,
+                "lease": 550,
+                "features": ["Leather Seats", "Sunroof", "Premium Sound System"],
+                "deals": ["2.9% APR for 36 months", "First 3 payments waived", "Complimentary maintenance package"]
+            }
+        ]
+    },
+    "suv": {
+        "economy": [
+            {
+                "name": "Toyota RAV4",
+                "price": 28000,
+                "lease": 350,
+                "features": ["All-Wheel Drive", "Lane Assist", "Safety Sense 2.0"],
+                "deals": ["1.9% APR for 60 months", "$2500 cash back", "Free winter tire package"]
+            }
+        ],
+        "luxury": [
+            {
+                "name": "Lexus RX",
+                "price": 50000,
+                "lease": 600,
+                "features": ["Premium Sound System", "Navigation", "Leather Interior"],
+                "deals": ["1.9% APR luxury financing", "Complimentary maintenance", "Lease loyalty bonus"]
             }
-        }
+        ]
+    }
+}
+
+
+class CarInventory:
+    def __init__(self, inventory: Optional[Dict[str, Any]] = None, snapshot_path: Optional[str] = None):
+        # With a snapshot the lot is read straight from the shared mmap
+        self.snapshot = InventorySnapshot(snapshot_path) if snapshot_path else None
+        self.inventory = None if self.snapshot else (inventory or DEFAULT_INVENTORY)
 
     def get_vehicles(self, vehicle_type: str, budget_category: str):
+        if self.snapshot:
+            return [self.snapshot.row(i) for i in self.snapshot.group(vehicle_type, budget_category)]
         return self.inventory.get(vehicle_type, {}).get(budget_category, [])
 
     def get_vehicle_details(self, vehicle_name: str):
+        if self.snapshot:
+            index = self.snapshot.find_name(vehicle_name)
+            return self.snapshot.row(index) if index >= 0 else None
         for category in self.inventory.values():
             for budget, vehicles in category.items():
                 for vehicle in vehicles:
                     if vehicle_name.lower() in vehicle["name"].lower():
                         return vehicle
-        return None
\ No newline at end of file
+        return None
+
+    def iter_vehicles(self) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+        """Yield (vehicle_type, budget_category, vehicle) for every vehicle on the lot."""
+        if self.snapshot:
+            yield from self.snapshot.iter_rows()
+            return
+        for vehicle_type, categories in self.inventory.items():
+            for budget_category, vehicles in categories.items():
+                for vehicle in vehicles:
+                    yield vehicle_type, budget_category, vehicle
\ No newline at end of file
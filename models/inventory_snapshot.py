@@ -0,0 +1,211 @@
+"""Read-only columnar inventory snapshot shared between worker processes.
+
+Layout: an 8-byte magic, a little-endian uint32 header length and a JSON
+header describing the columns, then the column data, each column 8-byte
+aligned. Numeric columns are float64 arrays. String columns are a uint32
+offset array (rows + 1 entries) followed by a UTF-8 blob; list values are
+joined with the unit separator. Every column has a uint8 validity array, so
+a vehicle without a key reads back without it. Keys outside the fixed
+columns (condition, year, ...) are kept per row as compact JSON in `extra`.
+Rows are sorted by (vehicle_type, budget_category) and the header maps each
+pair to its row range. `row()` returns the same dict as the source vehicle.
+
+Build one with:
+
+    python -m models.inventory_snapshot build inventory.snap [--source inventory.json]
+"""
+import sys
+import json
+import mmap
+import struct
+import argparse
+from array import array
+from typing import Any, Dict, Iterator, Tuple
+
+MAGIC = b"CINVSNP2"
+LIST_SEPARATOR = "\x1f"
+NUMERIC_COLUMNS = ("price", "lease")
+STRING_COLUMNS = ("vehicle_type", "budget_category", "name")
+LIST_COLUMNS = ("features", "deals")
+FIXED_KEYS = frozenset(NUMERIC_COLUMNS + STRING_COLUMNS + LIST_COLUMNS)
+
+
+def _pad(buffer: bytearray):
+    buffer.extend(b"\0" * (-len(buffer) % 8))
+
+
+def _column_values(name: str, rows) -> list:
+    """Values of one column, None where the vehicle has no such key. Raises on values the column cannot hold."""
+    if name == "vehicle_type":
+        return [t for t, _, _ in rows]
+    if name == "budget_category":
+        return [c for _, c, _ in rows]
+    if name == "extra":
+        extras = [{k: v for k, v in vehicle.items() if k not in FIXED_KEYS} for _, _, vehicle in rows]
+        return [json.dumps(extra, separators=(",", ":")) if extra else None for extra in extras]
+
+    values = [vehicle.get(name) for _, _, vehicle in rows]
+    for (_, _, vehicle), value in zip(rows, values):
+        if value is None:
+            if name == "name":
+                raise ValueError(f"Vehicle without a name: {vehicle!r}")
+        elif name in NUMERIC_COLUMNS:
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise ValueError(f"{vehicle.get('name')}: {name} must be a number, got {value!r}")
+        elif name in LIST_COLUMNS:
+            if not isinstance(value, list) or not all(isinstance(v, str) and v and LIST_SEPARATOR not in v for v in value):
+                raise ValueError(f"{vehicle.get('name')}: {name} must be a list of non-empty strings, got {value!r}")
+        elif not isinstance(value, str):
+            raise ValueError(f"{vehicle.get('name')}: {name} must be a string, got {value!r}")
+    return values
+
+
+def write_snapshot(inventory: Dict[str, Dict[str, list]], path: str) -> int:
+    """Write a nested {vehicle_type: {budget_category: [vehicle, ...]}} inventory. Returns the row count."""
+    rows, groups = [], {}
+    for vehicle_type in sorted(inventory):
+        for budget_category in sorted(inventory[vehicle_type]):
+            start = len(rows)
+            rows.extend((vehicle_type, budget_category, v) for v in inventory[vehicle_type][budget_category])
+            groups[f"{vehicle_type}/{budget_category}"] = [start, len(rows)]
+
+    data = bytearray()
+    columns = {}
+
+    def add_validity(name, values):
+        _pad(data)
+        columns[name]["valid"] = len(data)
+        data.extend(array("B", (value is not None for value in values)).tobytes())
+
+    for name in NUMERIC_COLUMNS:
+        values = _column_values(name, rows)
+        _pad(data)
+        # Integer-only columns read back as int, like the source dicts
+        integral = all(isinstance(v, int) for v in values if v is not None)
+        columns[name] = {"kind": "f64", "offset": len(data), "integral": integral}
+        data.extend(array("d", (0.0 if v is None else float(v) for v in values)).tobytes())
+        add_validity(name, values)
+
+    for name in STRING_COLUMNS + LIST_COLUMNS + ("extra",):
+        values = _column_values(name, rows)
+        if name in LIST_COLUMNS:
+            texts = ["" if v is None else LIST_SEPARATOR.join(v) for v in values]
+        else:
+            texts = ["" if v is None else v for v in values]
+        encoded = [text.encode("utf-8") for text in texts]
+        offsets = array("I", [0])
+        for blob in encoded:
+            offsets.append(offsets[-1] + len(blob))
+        _pad(data)
+        kind = "list" if name in LIST_COLUMNS else "json" if name == "extra" else "str"
+        columns[name] = {"kind": kind, "offset": len(data), "size": offsets[-1]}
+        data.extend(offsets.tobytes())
+        data.extend(b"".join(encoded))
+        add_validity(name, values)
+
+    header = json.dumps({
+        "rows": len(rows),
+        "byteorder": sys.byteorder,
+        "columns": columns,
+        "groups": groups
+    }).encode("utf-8")
+    prefix = bytearray(MAGIC + struct.pack("<I", len(header)) + header)
+    _pad(prefix)
+    with open(path, "wb") as f:
+        f.write(prefix)
+        f.write(data)
+    return len(rows)
+
+
+class InventorySnapshot:
+    """Zero-copy view over a snapshot file. All processes that open the same
+    file share its pages through the OS page cache."""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+        if bytes(view[:8]) != MAGIC:
+            raise ValueError(f"{path} is not an inventory snapshot of this version; rebuild it")
+        (header_len,) = struct.unpack("<I", view[8:12])
+        header = json.loads(bytes(view[12:12 + header_len]))
+        if header["byteorder"] != sys.byteorder:
+            raise ValueError(f"{path} was built on a {header['byteorder']}-endian host")
+
+        base = 12 + header_len + (-(12 + header_len) % 8)
+        self.rows = header["rows"]
+        self.groups = {key: tuple(span) for key, span in header["groups"].items()}
+        self._numeric = {}
+        self._strings = {}
+        self._valid = {}
+        for name, column in header["columns"].items():
+            start = base + column["offset"]
+            self._valid[name] = view[base + column["valid"]:base + column["valid"] + self.rows]
+            if column["kind"] == "f64":
+                self._numeric[name] = (view[start:start + 8 * self.rows].cast("d"), column["integral"])
+            else:
+                offsets_end = start + 4 * (self.rows + 1)
+                offsets = view[start:offsets_end].cast("I")
+                blob = view[offsets_end:offsets_end + column["size"]]
+                self._strings[name] = (offsets, blob, column["kind"])
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def _text(self, name: str, index: int):
+        offsets, blob, kind = self._strings[name]
+        text = str(blob[offsets[index]:offsets[index + 1]], "utf-8")
+        if kind == "list":
+            return text.split(LIST_SEPARATOR) if text else []
+        return text
+
+    def row(self, index: int) -> Dict[str, Any]:
+        row = {}
+        for name in ("name",) + NUMERIC_COLUMNS + LIST_COLUMNS:
+            if not self._valid[name][index]:
+                continue
+            if name in self._numeric:
+                values, integral = self._numeric[name]
+                row[name] = int(values[index]) if integral else values[index]
+            else:
+                row[name] = self._text(name, index)
+        if self._valid["extra"][index]:
+            row.update(json.loads(self._text("extra", index)))
+        return row
+
+    def group(self, vehicle_type: str, budget_category: str) -> range:
+        return range(*self.groups.get(f"{vehicle_type}/{budget_category}", (0, 0)))
+
+    def iter_rows(self) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+        for index in range(self.rows):
+            yield self._text("vehicle_type", index), self._text("budget_category", index), self.row(index)
+
+    def find_name(self, fragment: str) -> int:
+        """Index of the first row whose name contains `fragment` (case-insensitive), or -1."""
+        fragment = fragment.lower()
+        for index in range(self.rows):
+            if fragment in self._text("name", index).lower():
+                return index
+        return -1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build a columnar inventory snapshot")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build = subparsers.add_parser("build")
+    build.add_argument("output")
+    build.add_argument("--source", help="JSON inventory file; defaults to the built-in inventory")
+    args = parser.parse_args(argv)
+
+    if args.source:
+        with open(args.source, encoding="utf-8") as f:
+            inventory = json.load(f)
+    else:
+        from models.inventory import DEFAULT_INVENTORY
+        inventory = DEFAULT_INVENTORY
+    rows = write_snapshot(inventory, args.output)
+    print(f"Wrote {rows} vehicles to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import time
+import asyncio
+import contextlib
+from collections import OrderedDict
+from typing import AsyncIterator, Optional
+
+class AdmissionRejected(Exception):
+    """Raised when a request cannot be admitted; carries the HTTP status to return."""
+
+    def __init__(self, status_code: int, retry_after: float, reason: str):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def try_acquire(self) -> float:
+        """Take one token. Returns 0 on success, otherwise seconds until a token is available."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class AdmissionController:
+    """Global in-flight limit, per-client token buckets and a bounded wait queue.
+
+    Rate-limited clients are rejected with 429; when every slot is busy and the
+    queue is full, or a queued request waits longer than `max_queue_wait`, the
+    request is rejected with 503.
+
+    With a `parent`, an admitted request also holds one of the parent's slots,
+    so per-tenant quotas sit under a process-wide cap on in-flight requests.
+    """
+
+    def __init__(self, max_in_flight: int, max_queue: int, max_queue_wait: float,
+                 client_rate: float, client_burst: float, max_clients: int = 10000,
+                 parent: Optional["AdmissionController"] = None):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.max_queue_wait = max_queue_wait
+        self.client_rate = client_rate
+        self.client_burst = client_burst
+        self.max_clients = max_clients
+        self.parent = parent
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self.in_flight = 0
+        self.queued = 0
+        self.stats = {"admitted": 0, "rate_limited": 0, "queue_full": 0, "queue_timeout": 0}
+
+    def _bucket(self, client_id: str) -> TokenBucket:
+        bucket = self._buckets.get(client_id)
+        if bucket is None:
+            bucket = TokenBucket(self.client_rate, self.client_burst)
+            self._buckets[client_id] = bucket
+            # Bound memory: forget the least recently seen clients
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(client_id)
+        return bucket
+
+    @contextlib.asynccontextmanager
+    async def admit(self, client_id: str) -> AsyncIterator[None]:
+        wait = self._bucket(client_id).try_acquire()
+        if wait:
+            self.stats["rate_limited"] += 1
+            raise AdmissionRejected(429, wait, "rate_limited")
+
+        async with self.slot():
+            if self.parent is None:
+                yield
+            else:
+                async with self.parent.slot():
+                    yield
+
+    @contextlib.asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold one in-flight slot, queueing for it if all are busy. No rate limiting."""
+        if self._slots.locked():
+            if self.queued >= self.max_queue:
+                self.stats["queue_full"] += 1
+                raise AdmissionRejected(503, self.max_queue_wait, "queue_full")
+            self.queued += 1
+            try:
+                await asyncio.wait_for(self._slots.acquire(), self.max_queue_wait)
+            except asyncio.TimeoutError:
+                self.stats["queue_timeout"] += 1
+                raise AdmissionRejected(503, self.max_queue_wait, "queue_timeout")
+            finally:
+                self.queued -= 1
+        else:
+            await self._slots.acquire()
+
+        self.stats["admitted"] += 1
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+
+    def snapshot(self) -> dict:
+        return {"in_flight": self.in_flight, "queued": self.queued, **self.stats}
@@ -1,38 +1,46 @@
 import json
+import time
+import uuid
 import asyncio
 import logging
-from typing import Dict, Any
+import contextlib
+from dataclasses import dataclass
+from typing import Dict, Any, AsyncIterator, Optional
+from config import SYSTEM_CONTEXT
+from services.reply_policy import ReplyPolicy, MODEL, DIRECT, REWRITE, BACKGROUND
+from utils.recorder import TurnRecorder, current_trace, clear_trace
+from utils.log_pipeline import bind_correlation
+
+@dataclass
+class TurnPlan:
+    data: Dict[str, Any]  # updated conversation data
+    state: str            # state the message was processed in
+    reply: str            # deterministic reply from the state machine
+    mode: str             # how the reply will be produced (see services.reply_policy)
 
 class ChatService:
-    def __init__(self, model, conversation_manager):
+    def __init__(self, model, conversation_manager, recorder: Optional[TurnRecorder] = None, store=None,
+                 policy: Optional[ReplyPolicy] = None, system_context: str = SYSTEM_CONTEXT):
         self.model = model
         self.conversation_manager = conversation_manager
+        self.recorder = recorder or TurnRecorder(None)
+        self.store = store
+        self.policy = policy or ReplyPolicy({})
+        self.system_context = system_context
+        self._background = set()
         self.logger = logging.getLogger(__name__)
 
     async def process_message(self, message: str, conversation_data: Dict[str, Any]) -> Dict[str, Any]:
+        # Clients round-trip session_id/turn so log lines and recorded turns correlate
+        session_id = conversation_data.setdefault("session_id", uuid.uuid4().hex)
+        turn = conversation_data.get("turn", 0)
         try:
-            state = conversation_data.get("state", "greeting")
-            user_info = conversation_data.get("user_info", {})
-            vehicles = conversation_data.get("vehicles", [])
-
-            # Process the current state
-            response, next_state = self.conversation_manager.process_state(
-                state, message, user_info, vehicles
-            )
-
-            # Update conversation data
-            updated_data = {
-                "state": next_state,
-                "user_info": user_info,
-                "vehicles": vehicles,
-                "last_response": state
-            }
-
-            # Generate AI response
-            ai_response = await self._generate_ai_response(message, updated_data)
-            updated_data["content"] = ai_response.strip()
-
-            return updated_data
+            with bind_correlation(session_id, turn):
+                async with self.turn(message, conversation_data) as plan:
+                    # Generate AI response (or serve the scripted one)
+                    ai_response = "".join([chunk async for chunk in self.stream_reply(message, plan)])
+                    plan.data["content"] = ai_response.strip()
+            return plan.data
 
         except Exception as e:
             self.logger.error(f"Error processing message: {e}", exc_info=True)
@@ -41,12 +49,128 @@ class ChatService:
                 "state": conversation_data.get("state", "greeting")
             }
 
-    async def _generate_ai_response(self, message: str, context: Dict[str, Any]) -> str:
-        prompt = f"""
-        {SYSTEM_CONTEXT}
+    @contextlib.asynccontextmanager
+    async def turn(self, message: str, conversation_data: Dict[str, Any]) -> AsyncIterator[TurnPlan]:
+        """Plan one turn and record it. The caller produces the reply inside the
+        block and stores it in `plan.data["content"]`; the completed turn is then
+        traced and persisted. Shared by the HTTP and WebSocket paths."""
+        session_id = conversation_data.setdefault("session_id", uuid.uuid4().hex)
+        turn = conversation_data.get("turn", 0)
+        with self.recorder.turn("chat_service", session_id, turn, message, conversation_data) as trace:
+            with trace.stage("state"):
+                plan = self.plan_turn(message, conversation_data)
+            # Replay needs to know whether this turn called the model
+            trace.annotate("mode", plan.mode)
+            with trace.stage("generate"):
+                yield plan
+            trace.finish(plan.data["content"], plan.data)
+        self.persist_turn(session_id, turn, message, plan.data["content"])
+
+    def persist_turn(self, session_id: str, turn: int, message: str, reply: str):
+        """Hand a completed turn to the write-behind store, if one is configured."""
+        if self.store is not None:
+            self.store.record_turn(session_id, turn, "user", message)
+            self.store.record_turn(session_id, turn, "assistant", reply)
+
+    def plan_turn(self, message: str, conversation_data: Dict[str, Any]) -> TurnPlan:
+        """Advance the conversation state machine for one user message and
+        decide whether the reply needs the model."""
+        state = conversation_data.get("state", "greeting")
+        scripted = self.conversation_manager.is_scripted(conversation_data)
+        reply, updated_data = self._advance(message, conversation_data)
+        mode = self.policy.decide(state, updated_data["state"], conversation_data) if scripted else MODEL
+        return TurnPlan(updated_data, state, reply, mode)
+
+    async def stream_reply(self, message: str, plan: TurnPlan) -> AsyncIterator[str]:
+        """Yield reply tokens for a planned turn."""
+        started = time.perf_counter()
+        if plan.mode in (DIRECT, BACKGROUND):
+            yield self.policy.render(plan.state, plan.data["state"], plan.reply, plan.data["user_info"])
+            if plan.mode == BACKGROUND:
+                self._rephrase_later(plan)
+        elif plan.mode == REWRITE:
+            async for chunk in self._stream_model(self._rewrite_prompt(plan.reply)):
+                yield chunk
+        else:
+            async for chunk in self.stream_response(message, plan.data):
+                yield chunk
+        self.policy.record(plan.mode, time.perf_counter() - started)
+
+    def degraded_reply(self, message: str, conversation_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Serve the state machine's canned reply without a model call, if the state has one."""
+        if not self.conversation_manager.is_scripted(conversation_data):
+            return None
+        response, updated_data = self._advance(message, conversation_data)
+        updated_data["content"] = response
+        updated_data["degraded"] = True
+        return updated_data
+
+    def _advance(self, message: str, conversation_data: Dict[str, Any]):
+        state = conversation_data.get("state", "greeting")
+        user_info = conversation_data.get("user_info", {})
+        vehicles = conversation_data.get("vehicles", [])
+
+        # Process the current state
+        response, next_state = self.conversation_manager.process_state(
+            state, message, user_info, vehicles
+        )
+
+        # Update conversation data
+        return response, {
+            "state": next_state,
+            "user_info": user_info,
+            "vehicles": vehicles,
+            "last_response": state,
+            "session_id": conversation_data.get("session_id"),
+            "turn": conversation_data.get("turn", 0) + 1
+        }
+
+    async def stream_response(self, message: str, context: Dict[str, Any]) -> AsyncIterator[str]:
+        """Yield tokens of a full model reply for the given conversation context."""
+        async for chunk in self._stream_model(self._build_prompt(message, context)):
+            yield chunk
+
+    async def _stream_model(self, prompt: str, task: str = "reply") -> AsyncIterator[str]:
+        started = time.perf_counter()
+        parts = []
+        async for chunk in self.model.astream(prompt):
+            parts.append(chunk)
+            yield chunk
+
+        trace = current_trace()
+        if trace:
+            trace.model_call(task, prompt, "".join(parts), time.perf_counter() - started)
+
+    def _rephrase_later(self, plan: TurnPlan):
+        if not self.policy.wants_variant(plan.state, plan.data["state"]):
+            return
+        task = asyncio.create_task(self._rephrase(plan))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _rephrase(self, plan: TurnPlan):
+        # The task inherits the turn's trace, which may already be written
+        clear_trace()
+        try:
+            text = "".join([chunk async for chunk in self._stream_model(self._rewrite_prompt(plan.reply), "rephrase")])
+            self.policy.add_variant(plan.state, plan.data["state"], text)
+        except Exception as e:
+            self.logger.warning(f"Background rephrase failed: {e}")
+
+    def _rewrite_prompt(self, reply: str) -> str:
+        return f"""
+        {self.system_context}
+        Rephrase the following reply so it sounds natural and friendly. Keep its meaning
+        and its question, keep it to one or two sentences, and return only the new reply.
+        Reply: {reply}
+        Rephrased:
+        """
+
+    def _build_prompt(self, message: str, context: Dict[str, Any]) -> str:
+        return f"""
+        {self.system_context}
         Current Context:
         {json.dumps(context, indent=2)}
         User: {message}
         Assistant:
         """
-        return await asyncio.to_thread(self.model.invoke, prompt)
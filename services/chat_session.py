@@ -0,0 +1,144 @@
+import json
+import uuid
+import asyncio
+import contextlib
+import logging
+from typing import Dict, Any, Optional
+from fastapi import WebSocket, WebSocketDisconnect
+from pydantic import ValidationError
+from config import WS_IDLE_TIMEOUT_SECONDS
+from models.api import MAX_REQUEST_BYTES, SessionMessage, validation_errors
+from services.admission import AdmissionRejected
+from utils.log_pipeline import bind_correlation
+
+class ChatSession:
+    """Per-connection chat state for the WebSocket endpoint.
+
+    The client sends `{"type": "message", "message": ...}`, `{"type": "ping"}`
+    or `{"type": "cancel"}`. Replies stream back as `token` frames followed by a
+    `done` frame carrying the updated conversation data. A new message while a
+    reply is still generating cancels the old generation.
+    """
+
+    def __init__(self, websocket: WebSocket, chat_service, admission, client_id: str,
+                 idle_timeout: float = WS_IDLE_TIMEOUT_SECONDS):
+        self.websocket = websocket
+        self.chat_service = chat_service
+        self.admission = admission
+        self.client_id = client_id
+        self.idle_timeout = idle_timeout
+        self.session_id = uuid.uuid4().hex
+        self.conversation_data: Dict[str, Any] = {
+            "state": "greeting",
+            "user_info": {},
+            "vehicles": [],
+            "session_id": self.session_id
+        }
+        self.turn = 0
+        self._generation: Optional[asyncio.Task] = None
+        self.logger = logging.getLogger(__name__)
+
+    async def run(self):
+        try:
+            while True:
+                try:
+                    frame = await asyncio.wait_for(self.websocket.receive(), self.idle_timeout)
+                except asyncio.TimeoutError:
+                    # No heartbeat from the client within the idle window
+                    await self.websocket.close(code=1000)
+                    break
+                if frame["type"] == "websocket.disconnect":
+                    break
+                if frame.get("text") is None:
+                    await self._send({"type": "error", "error": "Expected a text frame"})
+                    continue
+                if len(frame["text"].encode("utf-8")) > MAX_REQUEST_BYTES:
+                    await self._send({"type": "error", "error": f"Frame exceeds {MAX_REQUEST_BYTES} bytes"})
+                    continue
+
+                try:
+                    payload = json.loads(frame["text"])
+                except json.JSONDecodeError:
+                    await self._send({"type": "error", "error": "Invalid JSON format"})
+                    continue
+                if not isinstance(payload, dict):
+                    await self._send({"type": "error", "error": "Expected a JSON object"})
+                    continue
+
+                kind = payload.get("type", "message")
+                if kind == "ping":
+                    await self._send({"type": "pong"})
+                elif kind == "cancel":
+                    await self.cancel()
+                elif kind == "message":
+                    try:
+                        message = SessionMessage.model_validate(payload).message
+                    except ValidationError as e:
+                        await self._send({"type": "error", "error": "Invalid message", "detail": validation_errors(e)})
+                        continue
+                    await self.cancel()
+                    self.turn += 1
+                    self._generation = asyncio.create_task(self._run_turn(self.turn, message))
+                else:
+                    await self._send({"type": "error", "error": f"Unknown message type: {kind}"})
+        except WebSocketDisconnect:
+            pass
+        finally:
+            await self.cancel()
+
+    async def cancel(self):
+        task, self._generation = self._generation, None
+        if task and not task.done():
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+
+    async def _run_turn(self, turn: int, message: str):
+        with bind_correlation(self.session_id, turn):
+            await self._handle_turn(turn, message)
+
+    async def _handle_turn(self, turn: int, message: str):
+        try:
+            async with self.admission.admit(self.client_id):
+                await self._stream_turn(turn, message)
+        except AdmissionRejected as rejected:
+            degraded = self.chat_service.degraded_reply(message, self.conversation_data)
+            if degraded is not None:
+                self.conversation_data = degraded
+                await self._send({**degraded, "type": "done", "turn": turn})
+            else:
+                await self._send({
+                    "type": "error",
+                    "turn": turn,
+                    "error": "Server is busy, please retry shortly",
+                    "retry_after": rejected.retry_after
+                })
+        except asyncio.CancelledError:
+            await self._send({"type": "cancelled", "turn": turn})
+            raise
+        except Exception as e:
+            self.logger.error(f"Error streaming turn {turn}: {e}", exc_info=True)
+            await self._send({
+                "type": "error",
+                "turn": turn,
+                "error": "I apologize, something went wrong. Please try again."
+            })
+
+    async def _stream_turn(self, turn: int, message: str):
+        # The state machine advances even if the reply is later cancelled,
+        # so a quick follow-up message builds on this one.
+        async with self.chat_service.turn(message, self.conversation_data) as plan:
+            self.conversation_data = plan.data
+
+            parts = []
+            async for chunk in self.chat_service.stream_reply(message, plan):
+                parts.append(chunk)
+                await self._send({"type": "token", "turn": turn, "content": chunk})
+
+            self.conversation_data["content"] = "".join(parts).strip()
+        await self._send({**self.conversation_data, "type": "done", "turn": turn})
+
+    async def _send(self, payload: Dict[str, Any]):
+        # The socket may already be gone when a cancelled turn reports back
+        with contextlib.suppress(WebSocketDisconnect, RuntimeError):
+            await self.websocket.send_json(payload)
@@ -0,0 +1,178 @@
+import time
+import asyncio
+import contextlib
+import logging
+from collections import deque
+from typing import AsyncIterator, Optional
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures and lets a single
+    trial request through once `reset_timeout` seconds have passed."""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def release(self):
+        """End a trial that was abandoned (cancelled or lost a hedge) without a verdict."""
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+
+class _Attempt:
+    def __init__(self, name: str, model, breaker: CircuitBreaker, prompt: str):
+        self.name = name
+        self.breaker = breaker
+        self.stream = model.astream(prompt)
+        self.first = asyncio.ensure_future(self.stream.__anext__())
+
+    async def close(self):
+        self.first.cancel()
+        with contextlib.suppress(BaseException):
+            await self.first
+        aclose = getattr(self.stream, "aclose", None)
+        if aclose is not None:
+            with contextlib.suppress(BaseException):
+                await aclose()
+
+
+class HedgedModel:
+    """Streams from `primary`, hedging to `fallback` when no first token arrives
+    within `first_token_budget` seconds. The first backend to produce a token
+    wins and the other stream is cancelled."""
+
+    def __init__(self, primary, fallback, first_token_budget: float,
+                 primary_breaker: Optional[CircuitBreaker] = None,
+                 fallback_breaker: Optional[CircuitBreaker] = None):
+        self.primary = primary
+        self.fallback = fallback
+        self.first_token_budget = first_token_budget
+        self.primary_breaker = primary_breaker or CircuitBreaker()
+        self.fallback_breaker = fallback_breaker or CircuitBreaker()
+        self.stats = {"requests": 0, "hedges": 0, "primary_wins": 0, "fallback_wins": 0, "breaker_skips": 0}
+        self.first_token_latencies = deque(maxlen=1000)
+        self.logger = logging.getLogger(__name__)
+
+    async def astream(self, prompt: str) -> AsyncIterator[str]:
+        self.stats["requests"] += 1
+        started = time.monotonic()
+        attempts = []
+        hedged = False
+
+        if self.primary_breaker.allow():
+            attempts.append(_Attempt("primary", self.primary, self.primary_breaker, prompt))
+        else:
+            self.stats["breaker_skips"] += 1
+
+        winner, first_chunk, error = None, None, None
+        try:
+            while winner is None:
+                if not attempts:
+                    if hedged or not self.fallback_breaker.allow():
+                        raise error or RuntimeError("No healthy model backend available")
+                    hedged = True
+                    attempts.append(_Attempt("fallback", self.fallback, self.fallback_breaker, prompt))
+
+                timeout = None if hedged else self.first_token_budget
+                done, _ = await asyncio.wait(
+                    [attempt.first for attempt in attempts],
+                    timeout=timeout,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+
+                if not done:
+                    if self.fallback_breaker.allow():
+                        self.logger.info("Primary model missed first-token budget, hedging to fallback")
+                        self.stats["hedges"] += 1
+                        attempts.append(_Attempt("fallback", self.fallback, self.fallback_breaker, prompt))
+                    hedged = True
+                    continue
+
+                for attempt in [a for a in attempts if a.first in done]:
+                    exc = attempt.first.exception()
+                    if exc is None or isinstance(exc, StopAsyncIteration):
+                        winner = attempt
+                        first_chunk = None if exc else attempt.first.result()
+                        break
+                    self.logger.warning(f"{attempt.name} model failed: {exc}")
+                    attempt.breaker.record_failure()
+                    attempts.remove(attempt)
+                    error = exc
+        finally:
+            for attempt in attempts:
+                if attempt is not winner:
+                    # A primary that lost after missing its budget counts against it
+                    if winner is not None and attempt.name == "primary":
+                        attempt.breaker.record_failure()
+                    attempt.breaker.release()
+                    await attempt.close()
+
+        self.first_token_latencies.append(time.monotonic() - started)
+        self.stats[f"{winner.name}_wins"] += 1
+
+        if first_chunk is None:
+            winner.breaker.record_success()
+            return
+
+        completed = False
+        try:
+            yield first_chunk
+            async for chunk in winner.stream:
+                yield chunk
+            completed = True
+        except Exception:
+            winner.breaker.record_failure()
+            raise
+        finally:
+            if completed:
+                winner.breaker.record_success()
+            else:
+                # Cancelled, closed early by the consumer (GeneratorExit) or failed
+                winner.breaker.release()
+                await winner.close()
+
+    def snapshot(self) -> dict:
+        latencies = sorted(self.first_token_latencies)
+
+        def percentile(p):
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))] if latencies else None
+
+        requests = self.stats["requests"] or 1
+        return {
+            **self.stats,
+            "hedge_rate": self.stats["hedges"] / requests,
+            "first_token_p50": percentile(0.50),
+            "first_token_p99": percentile(0.99),
+            "primary_breaker": self.primary_breaker.state,
+            "fallback_breaker": self.fallback_breaker.state
+        }
@@ -0,0 +1,158 @@
+import time
+import asyncio
+import threading
+from collections import deque
+from typing import Dict, List, AsyncIterator, Iterator, Optional
+
+class TaskModel:
+    """One configured model for one task, with its own concurrency limit and
+    latency/cost accounting. Token counts are estimated at ~4 characters per token."""
+
+    def __init__(self, task: str, spec):
+        self.task = task
+        self.spec = spec
+        self._sync_slots = threading.BoundedSemaphore(spec.max_concurrency)
+        self._async_slots = asyncio.Semaphore(spec.max_concurrency)
+        self._chat_client = None
+        self._llm_client = None
+        self.stats = {"calls": 0, "errors": 0, "seconds": 0.0, "tokens": 0, "cost": 0.0}
+        self.latencies = deque(maxlen=1000)
+
+    def complete(self, messages: List[Dict[str, str]], json_schema: Optional[dict] = None) -> str:
+        """Blocking chat completion for `messages` (OpenAI-style role/content dicts)."""
+        return "".join(self.stream(messages, json_schema))
+
+    def stream(self, messages: List[Dict[str, str]], json_schema: Optional[dict] = None) -> Iterator[str]:
+        """Stream a chat completion. With `json_schema` the backend is put in
+        structured-output mode (Ollama `format`, OpenAI JSON mode)."""
+        with self._sync_slots:
+            started = time.monotonic()
+            produced = 0
+            try:
+                for chunk in self._stream(messages, json_schema):
+                    produced += len(chunk)
+                    yield chunk
+            except Exception:
+                self.stats["errors"] += 1
+                raise
+            self._record(started, sum(len(m["content"]) for m in messages), produced)
+
+    async def astream(self, prompt: str) -> AsyncIterator[str]:
+        """Stream a completion for a plain-text prompt."""
+        async with self._async_slots:
+            started = time.monotonic()
+            produced = 0
+            try:
+                async for chunk in self._astream(prompt):
+                    produced += len(chunk)
+                    yield chunk
+            except Exception:
+                self.stats["errors"] += 1
+                raise
+            self._record(started, len(prompt), produced)
+
+    def _record(self, started: float, prompt_chars: int, output_chars: int):
+        elapsed = time.monotonic() - started
+        tokens = (prompt_chars + output_chars) // 4
+        self.stats["calls"] += 1
+        self.stats["seconds"] += elapsed
+        self.stats["tokens"] += tokens
+        self.stats["cost"] += tokens / 1000 * self.spec.cost_per_1k_tokens
+        self.latencies.append(elapsed)
+
+    def _stream(self, messages: List[Dict[str, str]], json_schema: Optional[dict]) -> Iterator[str]:
+        spec = self.spec
+        if spec.provider == "openai":
+            import openai
+            extra = {"response_format": {"type": "json_object"}} if json_schema else {}
+            response = openai.ChatCompletion.create(
+                model=spec.model,
+                temperature=spec.temperature,
+                top_p=spec.top_p,
+                max_tokens=spec.max_tokens,
+                messages=messages,
+                stream=True,
+                **extra
+            )
+            for chunk in response:
+                content = chunk.choices[0].delta.get("content")
+                if content:
+                    yield content
+            return
+
+        if self._chat_client is None:
+            from langchain_ollama import ChatOllama
+            self._chat_client = ChatOllama(
+                model=spec.model,
+                temperature=spec.temperature,
+                top_p=spec.top_p,
+                num_predict=spec.max_tokens
+            )
+        extra = {"format": json_schema} if json_schema else {}
+        for chunk in self._chat_client.stream(messages, **extra):
+            if chunk.content:
+                yield chunk.content
+
+    async def _astream(self, prompt: str) -> AsyncIterator[str]:
+        spec = self.spec
+        if spec.provider == "openai":
+            import openai
+            response = await openai.ChatCompletion.acreate(
+                model=spec.model,
+                temperature=spec.temperature,
+                top_p=spec.top_p,
+                max_tokens=spec.max_tokens,
+                messages=[{"role": "user", "content": prompt}],
+                stream=True
+            )
+            async for chunk in response:
+                content = chunk.choices[0].delta.get("content")
+                if content:
+                    yield content
+            return
+
+        if self._llm_client is None:
+            from langchain_ollama import OllamaLLM
+            self._llm_client = OllamaLLM(
+                model=spec.model,
+                temperature=spec.temperature,
+                top_p=spec.top_p,
+                num_predict=spec.max_tokens
+            )
+        async for chunk in self._llm_client.astream(prompt):
+            yield chunk
+
+    def snapshot(self) -> dict:
+        latencies = sorted(self.latencies)
+        return {
+            "provider": self.spec.provider,
+            "model": self.spec.model,
+            **self.stats,
+            "p50": latencies[len(latencies) // 2] if latencies else None,
+            "p99": latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))] if latencies else None
+        }
+
+
+class ModelRegistry:
+    """Routes each task (extraction, reply, summary, ...) to its configured model."""
+
+    def __init__(self, specs: Dict[str, object]):
+        self._models = {task: TaskModel(task, spec) for task, spec in specs.items()}
+
+    def __contains__(self, task: str) -> bool:
+        return task in self._models
+
+    def get(self, task: str) -> TaskModel:
+        try:
+            return self._models[task]
+        except KeyError:
+            raise KeyError(f"No model configured for task '{task}'")
+
+    def complete(self, task: str, messages: List[Dict[str, str]], json_schema: Optional[dict] = None) -> str:
+        return self.get(task).complete(messages, json_schema)
+
+    def stream(self, task: str, messages: List[Dict[str, str]], json_schema: Optional[dict] = None) -> Iterator[str]:
+        return self.get(task).stream(messages, json_schema)
+
+    def snapshot(self) -> dict:
+        return {task: model.snapshot() for task, model in self._models.items()}
@@ -0,0 +1,122 @@
+import json
+import time
+import sqlite3
+import logging
+import threading
+from collections import deque
+from typing import Any, Dict, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transcripts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    turn INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS transcripts_session ON transcripts (session_id, turn);
+CREATE TABLE IF NOT EXISTS leads (
+    session_id TEXT PRIMARY KEY,
+    customer TEXT NOT NULL,
+    summary TEXT,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+class WriteBehindStore:
+    """Buffers transcript turns and leads in memory and writes them to SQLite
+    (WAL mode) in batches from a background thread.
+
+    Callers never touch disk: a batch is flushed every `flush_interval`
+    seconds or as soon as `batch_size` items are pending. At most
+    `max_pending` items are held; beyond that new items are dropped and
+    counted. `close()` flushes everything still buffered.
+    """
+
+    def __init__(self, path: str, flush_interval: float = 1.0, batch_size: int = 200, max_pending: int = 10000):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.stats = {"queued": 0, "flushed": 0, "dropped": 0, "flushes": 0, "errors": 0}
+        self._pending = deque()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self.logger = logging.getLogger(__name__)
+        self._thread = threading.Thread(target=self._run, name="write-behind-store", daemon=True)
+        self._thread.start()
+
+    def record_turn(self, session_id: str, turn: int, role: str, content: str):
+        self._enqueue(("turn", (session_id, turn, role, content, time.time())))
+
+    def record_lead(self, session_id: str, customer: Dict[str, Any], summary: Optional[str] = None):
+        self._enqueue(("lead", (session_id, json.dumps(customer, default=str), summary, time.time())))
+
+    def _enqueue(self, item):
+        with self._lock:
+            if self._closed or len(self._pending) >= self.max_pending:
+                self.stats["dropped"] += 1
+                return
+            self._pending.append(item)
+            self.stats["queued"] += 1
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self._wake.set()
+
+    def _run(self):
+        conn = sqlite3.connect(self.path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        try:
+            while True:
+                self._wake.wait(self.flush_interval)
+                self._wake.clear()
+                self._flush(conn)
+                if self._closed:
+                    self._flush(conn)
+                    break
+        finally:
+            conn.close()
+
+    def _flush(self, conn: sqlite3.Connection):
+        with self._lock:
+            batch = list(self._pending)
+            self._pending.clear()
+        if not batch:
+            return
+
+        turns = [row for kind, row in batch if kind == "turn"]
+        leads = [row for kind, row in batch if kind == "lead"]
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT INTO transcripts (session_id, turn, role, content, created_at) VALUES (?, ?, ?, ?, ?)",
+                    turns
+                )
+                # A later summary must not be wiped by an earlier lead without one
+                conn.executemany(
+                    "INSERT INTO leads (session_id, customer, summary, updated_at) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(session_id) DO UPDATE SET customer = excluded.customer, "
+                    "summary = COALESCE(excluded.summary, leads.summary), updated_at = excluded.updated_at",
+                    leads
+                )
+            self.stats["flushed"] += len(batch)
+            self.stats["flushes"] += 1
+        except sqlite3.Error as e:
+            self.stats["errors"] += 1
+            self.logger.error(f"Failed to flush {len(batch)} records to {self.path}: {e}", exc_info=True)
+
+    def close(self, timeout: float = 10.0):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._wake.set()
+        self._thread.join(timeout)
+
+    def snapshot(self) -> dict:
+        return {"pending": len(self._pending), **self.stats}
@@ -0,0 +1,245 @@
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, fields
+from typing import Any, Dict, List, Optional, Tuple
+
+# Indicative financing APR by credit rating, used for the precomputed payment table
+APR_BY_CREDIT = {"Excellent": 0.049, "Very Good": 0.059, "Good": 0.069, "Fair": 0.099, "Poor": 0.149}
+DEFAULT_APR = APR_BY_CREDIT["Good"]
+FINANCE_TERMS = (36, 48, 60, 72)
+
+# Shared by every bot in the process; prefetching is cheap but must stay off the request thread
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="inventory-prefetch")
+
+
+def _number(value) -> Optional[float]:
+    """Parse '35k', '$35,000' or 35000 into a float; None for missing or 'N/A'."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if not isinstance(value, str):
+        return None
+    text = value.lower().replace("$", "").replace(",", "").strip()
+    for word in ("months", "month", "mo"):
+        text = text.replace(word, "").strip()
+    try:
+        return float(text[:-1]) * 1000 if text.endswith("k") else float(text)
+    except ValueError:
+        return None
+
+
+def _text(value) -> Optional[str]:
+    if not isinstance(value, str) or value.strip().lower() in ("", "n/a", "none", "any"):
+        return None
+    return value.strip().lower()
+
+
+def monthly_payment(principal: float, apr: float, months: int) -> float:
+    """Amortized monthly payment for a loan."""
+    if principal <= 0:
+        return 0.0
+    rate = apr / 12
+    if rate == 0:
+        return principal / months
+    return principal * rate / (1 - (1 + rate) ** -months)
+
+
+@dataclass(frozen=True)
+class Constraints:
+    # Filters on the lot
+    min_budget: Optional[float] = None
+    max_budget: Optional[float] = None
+    condition: Optional[str] = None
+    transaction_type: Optional[str] = None
+    car_type: Optional[str] = None
+    make: Optional[str] = None
+    model: Optional[str] = None
+    max_monthly_payment: Optional[float] = None
+    # Payment terms
+    credit_rating: Optional[str] = None
+    down_payment: Optional[float] = None
+    max_finance_term: Optional[float] = None
+
+    @classmethod
+    def from_customer(cls, customer) -> "Constraints":
+        return cls(
+            min_budget=_number(customer.min_budget),
+            max_budget=_number(customer.max_budget),
+            condition=_text(customer.car_condition),
+            transaction_type=_text(customer.transaction_type),
+            car_type=_text(customer.car_type),
+            make=_text(customer.make),
+            model=_text(customer.model),
+            max_monthly_payment=_number(customer.max_monthly_payment),
+            credit_rating=customer.credit_rating if customer.credit_rating in APR_BY_CREDIT else None,
+            down_payment=_number(customer.max_down_payment),
+            max_finance_term=_number(customer.max_finance_term)
+        )
+
+    @property
+    def empty(self) -> bool:
+        return all(getattr(self, f.name) is None for f in fields(self))
+
+    def narrows(self, previous: "Constraints") -> bool:
+        """True if every vehicle matching self also matches `previous`, so a
+        candidate set built for `previous` can be filtered instead of rescanning."""
+        def tighter(new, old, keep_lower):
+            return old is None or (new is not None and (new <= old if keep_lower else new >= old))
+
+        if previous.credit_rating != self.credit_rating or previous.down_payment != self.down_payment \
+                or previous.max_finance_term != self.max_finance_term:
+            return False
+        # The monthly cap applies to the lease figure when leasing and to the
+        # finance payment otherwise, so switching can admit excluded vehicles
+        if previous.transaction_type != self.transaction_type \
+                and (self.max_monthly_payment is not None or previous.max_monthly_payment is not None):
+            return False
+        if not (tighter(self.max_budget, previous.max_budget, True)
+                and tighter(self.min_budget, previous.min_budget, False)
+                and tighter(self.max_monthly_payment, previous.max_monthly_payment, True)):
+            return False
+        return all(
+            getattr(previous, name) is None or getattr(previous, name) == getattr(self, name)
+            for name in ("condition", "transaction_type", "car_type", "make", "model")
+        )
+
+    def payments(self, vehicle: Dict[str, Any]) -> Dict[str, Any]:
+        price = float(vehicle.get("price", 0))
+        principal = price - (self.down_payment or 0.0)
+        apr = APR_BY_CREDIT.get(self.credit_rating, DEFAULT_APR)
+        terms = [t for t in FINANCE_TERMS if not self.max_finance_term or t <= self.max_finance_term] \
+            or [FINANCE_TERMS[0]]
+        return {
+            "apr": apr,
+            "finance": {months: round(monthly_payment(principal, apr, months), 2) for months in terms},
+            "lease": vehicle.get("lease")
+        }
+
+    def matches(self, vehicle_type: str, vehicle: Dict[str, Any], payments: Dict[str, Any]) -> bool:
+        name = vehicle.get("name", "").lower()
+        price = float(vehicle.get("price", 0))
+        if self.car_type and vehicle_type != self.car_type:
+            return False
+        if self.make and not name.startswith(self.make):
+            return False
+        if self.model and self.model not in name:
+            return False
+        # The lot has no condition column yet; unlabelled vehicles are new
+        if self.condition and vehicle.get("condition", "new") != self.condition:
+            return False
+        if self.max_budget is not None and price > self.max_budget:
+            return False
+        if self.min_budget is not None and price < self.min_budget * 0.8:
+            # A loose floor: slightly cheaper cars are still worth showing
+            return False
+        if self.transaction_type == "lease":
+            if payments["lease"] is None:
+                return False
+            if self.max_monthly_payment is not None and payments["lease"] > self.max_monthly_payment:
+                return False
+        elif self.max_monthly_payment is not None and min(payments["finance"].values()) > self.max_monthly_payment:
+            return False
+        return True
+
+
+@dataclass
+class Candidate:
+    vehicle_type: str
+    budget_category: str
+    vehicle: Dict[str, Any]
+    payments: Dict[str, Any]
+
+
+class _SessionCache:
+    def __init__(self):
+        self.cached: Optional[Tuple[Constraints, List[Candidate]]] = None
+        self.pending: Optional[Tuple[Constraints, Future]] = None
+
+
+class InventoryPrefetcher:
+    """Keeps, per session, a candidate vehicle set with payment options in step
+    with the customer's known constraints.
+
+    `update()` is called whenever customer fields change and narrows the set in
+    the background: when constraints only tighten the previous candidates are
+    filtered, otherwise the lot is rescanned. `candidates()` returns the cached
+    set, waiting for an in-flight refresh or computing it inline on a miss.
+    One prefetcher serves the whole process; the `max_sessions` most recently
+    active sessions keep their candidates between turns.
+    """
+
+    def __init__(self, inventory, executor: Optional[ThreadPoolExecutor] = None, max_sessions: int = 10000):
+        self.inventory = inventory
+        self.executor = executor or _executor
+        self.max_sessions = max_sessions
+        self._lock = threading.Lock()
+        self._sessions: "OrderedDict[str, _SessionCache]" = OrderedDict()
+        self.stats = {"refreshes": 0, "narrowed": 0, "full_scans": 0, "hits": 0, "misses": 0}
+        self.logger = logging.getLogger(__name__)
+
+    def _session(self, session_id: str) -> _SessionCache:
+        # Caller holds self._lock
+        cache = self._sessions.get(session_id)
+        if cache is None:
+            cache = self._sessions[session_id] = _SessionCache()
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        else:
+            self._sessions.move_to_end(session_id)
+        return cache
+
+    def update(self, session_id: str, customer):
+        constraints = Constraints.from_customer(customer)
+        if constraints.empty:
+            return
+        with self._lock:
+            cache = self._session(session_id)
+            if cache.pending and cache.pending[0] == constraints:
+                return
+            if cache.cached and cache.cached[0] == constraints:
+                return
+            future = self.executor.submit(self._refresh, cache, constraints)
+            cache.pending = (constraints, future)
+
+    def candidates(self, session_id: str, customer, timeout: float = 1.0) -> List[Candidate]:
+        constraints = Constraints.from_customer(customer)
+        with self._lock:
+            cache = self._session(session_id)
+            cached, pending = cache.cached, cache.pending
+        if cached and cached[0] == constraints:
+            self.stats["hits"] += 1
+            return cached[1]
+        if pending and pending[0] == constraints:
+            try:
+                result = pending[1].result(timeout)
+                self.stats["hits"] += 1
+                return result
+            except Exception as e:
+                self.logger.warning(f"Inventory prefetch failed: {e}")
+        self.stats["misses"] += 1
+        return self._refresh(cache, constraints)
+
+    def _refresh(self, cache: _SessionCache, constraints: Constraints) -> List[Candidate]:
+        with self._lock:
+            cached = cache.cached
+        self.stats["refreshes"] += 1
+        if cached and constraints.narrows(cached[0]):
+            self.stats["narrowed"] += 1
+            source = ((c.vehicle_type, c.budget_category, c.vehicle) for c in cached[1])
+        else:
+            self.stats["full_scans"] += 1
+            source = self.inventory.iter_vehicles()
+
+        result = []
+        for vehicle_type, budget_category, vehicle in source:
+            payments = constraints.payments(vehicle)
+            if constraints.matches(vehicle_type, vehicle, payments):
+                result.append(Candidate(vehicle_type, budget_category, vehicle, payments))
+        result.sort(key=lambda c: c.vehicle.get("price", 0))
+
+        with self._lock:
+            cache.cached = (constraints, result)
+            if cache.pending and cache.pending[0] == constraints:
+                cache.pending = None
+        return result
@@ -0,0 +1,118 @@
+import random
+from collections import deque
+from typing import Any, Dict, Iterable
+
+# How a turn's reply is produced
+MODEL = "model"            # full LLM generation
+DIRECT = "direct"          # serve the deterministic reply (or a template variant) without a model call
+REWRITE = "rewrite"        # ask the LLM to rephrase the deterministic reply
+BACKGROUND = "background"  # serve directly, and grow the variant pool with an LLM rephrase off the request path
+
+# Phrasings for scripted transitions, keyed by (state, next_state). Placeholders
+# are filled from user_info; a variant whose fields are missing is skipped.
+TEMPLATES = {
+    ("greeting", "get_intent"): [
+        "Hello! Are you looking to buy or lease a car today?",
+        "Hi there! Are you hoping to buy or lease your next car?",
+        "Welcome! Would you like to buy or lease a vehicle today?"
+    ],
+    ("get_intent", "get_intent"): [
+        "Please specify if you want to buy or lease a vehicle.",
+        "Just to be sure, are you planning to buy or to lease?"
+    ],
+    ("get_intent", "get_vehicle_type"): [
+        "What type of vehicle are you interested in? (e.g., Sedan, SUV, Truck, or Van)",
+        "Great, you'd like to {purchase_type}. What type of vehicle are you after: Sedan, SUV, Truck, or Van?"
+    ],
+    ("get_intent", "get_budget"): [
+        "Great choice! What's your budget range?",
+        "Sounds good, let's find you the right {vehicle_type}. What's your budget range?"
+    ],
+    ("get_vehicle_type", "get_vehicle_type"): [
+        "Please specify the type of vehicle (Sedan, SUV, Truck, or Van).",
+        "Which kind of vehicle suits you best: Sedan, SUV, Truck, or Van?"
+    ],
+    ("get_vehicle_type", "get_budget"): [
+        "Great choice! What's your budget range?",
+        "Great, let's find you the right {vehicle_type}. What's your budget range?"
+    ],
+    ("get_intent", "confirm_budget"): [
+        "Great choice! I've noted a budget of about ${budget:,.0f}. Shall I show you what we have in that range?",
+        "Sounds good, let's find you the right {vehicle_type} for around ${budget:,.0f}. Shall I show you some options?"
+    ],
+    ("get_vehicle_type", "confirm_budget"): [
+        "Great choice! I've noted a budget of about ${budget:,.0f}. Shall I show you what we have in that range?",
+        "Great, let's find you the right {vehicle_type} for around ${budget:,.0f}. Shall I show you some options?"
+    ],
+    ("confirm_budget", "confirm_budget"): [
+        "Great choice! I've noted a budget of about ${budget:,.0f}. Shall I show you what we have in that range?",
+        "Just to confirm, you're looking at around ${budget:,.0f}. Shall I show you some options?"
+    ],
+    ("confirm_budget", "get_budget"): [
+        "No problem. What budget range should I use instead?",
+        "Sure, what budget would you like me to work with?"
+    ]
+}
+
+# Canned replies on the way into these states quote the customer's own budget
+# or matches, so they are never rephrased into the shared variant pool
+PERSONAL_STATES = frozenset({"confirm_budget", "show_vehicles"})
+
+
+class ReplyPolicy:
+    """Decides per state (or per (state, next_state) transition) whether a
+    turn needs the model, and tracks how many turns skipped it."""
+
+    def __init__(self, modes: Dict[Any, str], max_variants: int = 8):
+        self.modes = modes
+        self.max_variants = max_variants
+        self.variants = {key: list(texts) for key, texts in TEMPLATES.items()}
+        self.stats = {MODEL: 0, DIRECT: 0, REWRITE: 0, BACKGROUND: 0}
+        self.latencies = {mode: deque(maxlen=1000) for mode in self.stats}
+
+    @classmethod
+    def for_states(cls, states: Iterable[str], mode: str = DIRECT) -> "ReplyPolicy":
+        return cls({state: mode for state in states})
+
+    def decide(self, state: str, next_state: str, conversation_data: Dict[str, Any]) -> str:
+        mode = self.modes.get((state, next_state), self.modes.get(state, MODEL))
+        if mode != MODEL and conversation_data.get("rephrase"):
+            # The client asked for a freshly worded reply
+            return REWRITE
+        return mode
+
+    def render(self, state: str, next_state: str, canned: str, user_info: Dict[str, Any]) -> str:
+        candidates = []
+        for text in self.variants.get((state, next_state), []):
+            try:
+                candidates.append(text.format(**user_info))
+            except (KeyError, IndexError, ValueError):
+                continue
+        return random.choice(candidates) if candidates else canned
+
+    def wants_variant(self, state: str, next_state: str) -> bool:
+        if next_state in PERSONAL_STATES:
+            return False
+        return len(self.variants.get((state, next_state), [])) < self.max_variants
+
+    def add_variant(self, state: str, next_state: str, text: str):
+        # Braces from the model would break str.format in render
+        text = text.strip().replace("{", "").replace("}", "")
+        variants = self.variants.setdefault((state, next_state), [])
+        if text and text not in variants and len(variants) < self.max_variants:
+            variants.append(text)
+
+    def record(self, mode: str, seconds: float):
+        self.stats[mode] += 1
+        self.latencies[mode].append(seconds)
+
+    def snapshot(self) -> dict:
+        total = sum(self.stats.values())
+        served_without_model = self.stats[DIRECT] + self.stats[BACKGROUND]
+        mean = lambda values: sum(values) / len(values) if values else None
+        return {
+            "turns": total,
+            **self.stats,
+            "skipped_share": served_without_model / total if total else 0.0,
+            "mean_latency": {mode: mean(values) for mode, values in self.latencies.items()}
+        }
@@ -0,0 +1,145 @@
+import json
+import time
+import asyncio
+import logging
+import contextlib
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Tuple
+
+@dataclass(frozen=True)
+class TenantConfig:
+    tenant_id: str
+    hosts: Tuple[str, ...] = ()
+    inventory_snapshot: Optional[str] = None
+    knowledge_base: Optional[str] = None  # path to a text file appended to the system prompt
+    prompt_prefix: str = ""
+    models: Dict[str, Dict[str, Any]] = field(default_factory=dict)  # per-task ModelSpec overrides
+    # Concurrency quota; unset values fall back to the ADMISSION_* settings
+    max_concurrency: Optional[int] = None
+    max_queue: Optional[int] = None
+    max_queue_wait: Optional[float] = None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TenantConfig":
+        data = dict(data)
+        data["hosts"] = tuple(host.lower() for host in data.get("hosts", ()))
+        return cls(**data)
+
+    def system_context(self, base: str) -> str:
+        parts = [self.prompt_prefix, base]
+        if self.knowledge_base:
+            with open(self.knowledge_base, encoding="utf-8") as f:
+                parts.append(f"Dealership knowledge base:\n{f.read().strip()}")
+        return "\n\n".join(part for part in parts if part)
+
+
+@dataclass
+class Tenant:
+    config: TenantConfig
+    chat_service: Any
+    models: Any
+    model: Any
+    admission: Any
+    active: int = 0  # requests and WebSocket sessions currently using this tenant
+    last_used: float = field(default_factory=time.monotonic)
+
+    @property
+    def busy(self) -> bool:
+        return bool(self.active or self.admission.in_flight or self.admission.queued)
+
+    def snapshot(self) -> dict:
+        return {
+            "active": self.active,
+            "idle_seconds": time.monotonic() - self.last_used,
+            "reply_policy": self.chat_service.policy.snapshot(),
+            "admission": self.admission.snapshot(),
+            "models": self.models.snapshot(),
+            "hedging": self.model.snapshot() if hasattr(self.model, "snapshot") else None
+        }
+
+
+class TenantRegistry:
+    """Resolves requests to dealership tenants and loads them lazily.
+
+    At most `max_loaded` tenants are kept in memory; tenants idle for longer
+    than `idle_ttl` seconds, or the least recently used ones beyond the cap,
+    are evicted unless they are serving requests or open sessions.
+    """
+
+    def __init__(self, configs: Dict[str, TenantConfig], build: Callable[[TenantConfig], Tenant],
+                 default_tenant: Optional[str], max_loaded: int, idle_ttl: float):
+        self.configs = configs
+        self.build = build
+        self.default_tenant = default_tenant
+        self.max_loaded = max_loaded
+        self.idle_ttl = idle_ttl
+        self._hosts = {host: config.tenant_id for config in configs.values() for host in config.hosts}
+        self._loaded: "OrderedDict[str, Tenant]" = OrderedDict()
+        self._loading: Dict[str, asyncio.Lock] = {}
+        self.stats = {"loads": 0, "evictions": 0}
+        self.logger = logging.getLogger(__name__)
+
+    @classmethod
+    def from_file(cls, path: str, build: Callable[[TenantConfig], Tenant], **kwargs) -> "TenantRegistry":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        configs = {c["tenant_id"]: TenantConfig.from_dict(c) for c in data["tenants"]}
+        return cls(configs, build, data.get("default"), **kwargs)
+
+    def resolve_host(self, host: Optional[str]) -> Optional[str]:
+        if host:
+            tenant_id = self._hosts.get(host.split(":")[0].lower())
+            if tenant_id:
+                return tenant_id
+        return self.default_tenant
+
+    @contextlib.asynccontextmanager
+    async def use(self, tenant_id: Optional[str]) -> AsyncIterator[Optional[Tenant]]:
+        """Yield the tenant (None if unknown), pinned against eviction until the block exits."""
+        tenant = await self._load(tenant_id)
+        if tenant is None:
+            yield None
+            return
+        # Pinned before anything else can run, so eviction never sees it idle
+        tenant.active += 1
+        try:
+            self._loaded.move_to_end(tenant_id)
+            self.evict()
+            yield tenant
+        finally:
+            tenant.active -= 1
+            tenant.last_used = time.monotonic()
+
+    async def _load(self, tenant_id: Optional[str]) -> Optional[Tenant]:
+        if tenant_id not in self.configs:
+            return None
+        tenant = self._loaded.get(tenant_id)
+        if tenant is None:
+            lock = self._loading.setdefault(tenant_id, asyncio.Lock())
+            async with lock:
+                tenant = self._loaded.get(tenant_id)
+                if tenant is None:
+                    # Snapshot and knowledge-base loading is file I/O; keep it off the event loop
+                    tenant = await asyncio.to_thread(self.build, self.configs[tenant_id])
+                    self._loaded[tenant_id] = tenant
+                    self.stats["loads"] += 1
+                    self.logger.info(f"Loaded tenant {tenant_id}")
+        return tenant
+
+    def evict(self):
+        now = time.monotonic()
+        for tenant_id, tenant in list(self._loaded.items()):
+            over_cap = len(self._loaded) > self.max_loaded
+            idle = now - tenant.last_used > self.idle_ttl
+            if (over_cap or idle) and not tenant.busy:
+                del self._loaded[tenant_id]
+                self.stats["evictions"] += 1
+                self.logger.info(f"Evicted tenant {tenant_id}")
+
+    def snapshot(self) -> dict:
+        return {
+            **self.stats,
+            "configured": len(self.configs),
+            "loaded": {tenant_id: tenant.snapshot() for tenant_id, tenant in self._loaded.items()}
+        }
@@ -0,0 +1,96 @@
+import pytest
+
+from models.inventory import DEFAULT_INVENTORY, CarInventory
+from models.inventory_snapshot import MAGIC, InventorySnapshot, write_snapshot
+
+LOT = {
+    "sedan": {
+        "economy": [
+            {"name": "Camry", "price": 25000, "lease": 300, "features": ["Bluetooth"], "deals": []},
+            # No lease column, extra keys and a float price
+            {"name": "Corolla", "price": 21999.5, "condition": "used", "year": 2021, "features": ["CarPlay"]},
+        ],
+        "luxury": [{"name": "BMW 3 Series", "price": 42000, "lease": 550.75}],
+    },
+    "suv": {"economy": [{"name": "RAV4", "price": 28000, "lease": 350, "deals": ["$2500 cash back"]}]},
+}
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    path = tmp_path / "inventory.snap"
+    write_snapshot(LOT, str(path))
+    return InventorySnapshot(str(path))
+
+
+def source_rows(inventory):
+    return [
+        (vehicle_type, budget_category, vehicle)
+        for vehicle_type in sorted(inventory)
+        for budget_category in sorted(inventory[vehicle_type])
+        for vehicle in inventory[vehicle_type][budget_category]
+    ]
+
+
+def test_rows_read_back_identical_to_the_source(snapshot):
+    assert len(snapshot) == 4
+    assert list(snapshot.iter_rows()) == source_rows(LOT)
+
+
+def test_missing_keys_stay_missing(snapshot):
+    corolla = snapshot.row(snapshot.find_name("corolla"))
+    assert "lease" not in corolla and "deals" not in corolla
+    assert snapshot.row(snapshot.find_name("camry"))["deals"] == []
+
+
+def test_numeric_columns_keep_int_or_float(snapshot, tmp_path):
+    # One float makes the whole column float, as the source's mixed values compare equal
+    assert snapshot.row(snapshot.find_name("bmw"))["lease"] == 550.75
+    assert isinstance(snapshot.row(snapshot.find_name("camry"))["price"], float)
+
+    path = tmp_path / "ints.snap"
+    write_snapshot({"van": {"economy": [{"name": "Sienna", "price": 36000, "lease": 420}]}}, str(path))
+    sienna = InventorySnapshot(str(path)).row(0)
+    assert sienna == {"name": "Sienna", "price": 36000, "lease": 420}
+    assert all(isinstance(sienna[key], int) for key in ("price", "lease"))
+
+
+def test_extra_keys_round_trip(snapshot):
+    corolla = snapshot.row(snapshot.find_name("corolla"))
+    assert corolla["condition"] == "used" and corolla["year"] == 2021
+
+
+def test_groups_map_to_row_ranges(snapshot):
+    assert [snapshot.row(i)["name"] for i in snapshot.group("sedan", "economy")] == ["Camry", "Corolla"]
+    assert list(snapshot.group("truck", "economy")) == []
+
+
+def test_inventory_backends_agree(tmp_path):
+    path = tmp_path / "default.snap"
+    write_snapshot(DEFAULT_INVENTORY, str(path))
+    mapped, plain = CarInventory(snapshot_path=str(path)), CarInventory()
+    assert sorted(map(repr, mapped.iter_vehicles())) == sorted(map(repr, plain.iter_vehicles()))
+    assert mapped.get_vehicles("suv", "luxury") == plain.get_vehicles("suv", "luxury")
+    assert mapped.get_vehicle_details("accord") == plain.get_vehicle_details("accord")
+
+
+@pytest.mark.parametrize("vehicle", [
+    {"price": 1},
+    {"name": "X", "price": "cheap"},
+    {"name": "X", "price": True},
+    {"name": "X", "features": "Bluetooth"},
+    {"name": "X", "features": ["a\x1fb"]},
+    {"name": "X", "deals": [""]},
+])
+def test_values_a_column_cannot_hold_are_rejected(tmp_path, vehicle):
+    with pytest.raises(ValueError):
+        write_snapshot({"sedan": {"economy": [vehicle]}}, str(tmp_path / "bad.snap"))
+
+
+def test_other_versions_are_rejected(tmp_path):
+    path = tmp_path / "old.snap"
+    path.write_bytes(b"CINVSNP1" + bytes(64))
+    assert MAGIC != b"CINVSNP1"
+    with pytest.raises(ValueError, match="rebuild"):
+        InventorySnapshot(str(path))
+
@@ -0,0 +1,76 @@
+import pytest
+
+from utils.json_stream import IncrementalJSONParser, repair_json
+
+
+def feed_all(text, size=3):
+    parser = IncrementalJSONParser()
+    emitted = []
+    for i in range(0, len(text), size):
+        emitted.append(parser.feed(text[i:i + size]))
+    return parser, emitted
+
+
+def test_parser_emits_each_field_as_it_completes():
+    parser = IncrementalJSONParser()
+    assert parser.feed('{"name": "Jo') == {}
+    assert parser.feed('hn", "age": 4') == {"name": "John"}
+    assert parser.feed('2}') == {"age": 42}
+    assert parser.complete
+    assert parser.fields == {"name": "John", "age": 42}
+
+
+def test_parser_ignores_prose_and_fences_around_the_object():
+    parser, _ = feed_all('Sure! ```json\n{"make": "Toyota", "model": null}\n``` done')
+    assert parser.complete
+    assert parser.fields == {"make": "Toyota", "model": None}
+
+
+def test_parser_keeps_braces_and_commas_inside_strings():
+    parser, _ = feed_all('{"note": "a, {b} [c]", "zip": "12345"}')
+    assert parser.fields == {"note": "a, {b} [c]", "zip": "12345"}
+
+
+def test_parser_keeps_nested_values_whole():
+    parser, _ = feed_all('{"car": {"make": "Kia", "tags": [1, 2]}, "ok": true}')
+    assert parser.fields == {"car": {"make": "Kia", "tags": [1, 2]}, "ok": True}
+
+
+def test_parser_counts_fields_that_do_not_parse():
+    parser, _ = feed_all("{'name': 'John', \"age\": 42}")
+    assert parser.complete
+    assert parser.fields == {"age": 42}
+    assert parser.failed_segments == 1
+
+
+def test_parser_truncated_output_is_incomplete():
+    parser, _ = feed_all('{"name": "John", "email": "j@x')
+    assert not parser.complete
+    assert parser.fields == {"name": "John"}
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('```json\n{"a": 1}\n```', {"a": 1}),
+    ('Here you go: {"a": 1} hope that helps', {"a": 1}),
+    ("{'a': 'it\\'s', 'b': \"say \\\"hi\\\"\"}", {"a": "it's", "b": 'say "hi"'}),
+    ("{'a': 'say \"hi\"'}", {"a": 'say "hi"'}),
+    ('{"a": True, "b": None, "c": False}', {"a": True, "b": None, "c": False}),
+    ('{"a": [1, 2,], "b": 3,}', {"a": [1, 2], "b": 3}),
+])
+def test_repair_fixes_near_json(text, expected):
+    assert repair_json(text) == expected
+
+
+def test_repair_closes_truncated_containers():
+    assert repair_json('{"a": 1, "b": [1, 2') == {"a": 1, "b": [1, 2]}
+    assert repair_json('{"a": 1, "b":') == {"a": 1, "b": None}
+
+
+def test_repair_drops_a_field_cut_off_inside_a_string():
+    assert repair_json('{"name": "John", "email": "j@x') == {"name": "John"}
+    assert repair_json('{"name": "John", "car": {"make": "Ki') == {"name": "John"}
+
+
+@pytest.mark.parametrize("text", ["", "no json here", "[1, 2]", '{"a": 1 "b": 2}'])
+def test_repair_gives_up_on_what_it_cannot_fix(text):
+    assert repair_json(text) is None
@@ -0,0 +1,105 @@
+import pytest
+
+from models.inventory import CarInventory
+from utils.conversation import ConversationManager
+from utils.matcher import MATCHER, NOT_TYPOS, IntentMatcher, edit_distance
+
+
+@pytest.mark.parametrize("message, intent, vehicle_type", [
+    ("I want to buy a car", "buy", None),
+    ("We're thinking about leasing", "lease", None),
+    ("financing if possible", "buy", None),
+    ("buy or lease, not sure", "buy", None),
+    ("a pick up truck", None, "truck"),
+    ("maybe a crossover", None, "suv"),
+    ("a 4 door would do", None, "sedan"),
+    ("a four door", None, "sedan"),
+    ("a 4x4", None, "suv"),
+    ("something with an advantage on mileage", None, None),
+    ("I'd like to lease a crossover under 30k", "lease", "suv"),
+])
+def test_synonyms_and_phrases(message, intent, vehicle_type):
+    match = MATCHER.match(message)
+    assert (match.intent, match.vehicle_type) == (intent, vehicle_type)
+
+
+@pytest.mark.parametrize("message, intent, vehicle_type", [
+    ("Looking to lese something", "lease", None),
+    ("a sedna", None, "sedan"),
+    ("a truk for work", None, "truck"),
+    ("a trcuk", None, "truck"),
+])
+def test_typos_are_corrected(message, intent, vehicle_type):
+    match = MATCHER.match(message)
+    assert (match.intent, match.vehicle_type) == (intent, vehicle_type)
+
+
+@pytest.mark.parametrize("message", [
+    "please call me", "at least", "I have to leave soon", "I'm stuck", "that struck me",
+    "you guys were great", "fans of the brand", "the trunk space",
+])
+def test_everyday_words_are_not_corrected(message):
+    match = MATCHER.match(message)
+    assert (match.intent, match.vehicle_type) == (None, None)
+
+
+def test_not_typos_are_left_alone():
+    for word in NOT_TYPOS:
+        assert MATCHER.correct(word) == word
+
+
+def test_ambiguous_corrections_are_left_alone():
+    matcher = IntentMatcher({"vehicle_type": {"a": ["cart"], "b": ["card"]}})
+    assert matcher.correct("carx") == "carx"
+    assert matcher.correct("cartt") == "cart"
+
+
+@pytest.mark.parametrize("message, budget", [
+    ("around $30,000", 30000),
+    ("30k tops", 30000),
+    ("40 thousand", 40000),
+    ("between 25k and $32,500", 32500),
+    ("a 2019 model under 20k", 20000),
+    ("a 2019 or 2020 model", None),
+    ("$2,019", 2019),
+    ("2 kids and 3 dogs", None),
+])
+def test_budget_amounts_and_model_years(message, budget):
+    assert MATCHER.match(message).budget == budget
+
+
+def test_edit_distance_counts_adjacent_swaps_once():
+    assert edit_distance("trcuk", "truck", 2) == 1
+    assert edit_distance("sedan", "sedan", 1) == 0
+    assert edit_distance("van", "crossover", 1) == 2
+
+
+@pytest.fixture
+def manager():
+    return ConversationManager(CarInventory())
+
+
+def test_volunteered_budget_is_confirmed_not_asked(manager):
+    user_info = {}
+    reply, state = manager.process_state("get_intent", "I want to buy a sedan for about 30k", user_info, [])
+    assert state == "confirm_budget"
+    assert "$30,000" in reply and "budget range" not in reply
+    assert user_info == {"purchase_type": "buy", "vehicle_type": "sedan",
+                         "budget": 30000, "budget_category": "economy"}
+
+
+def test_confirm_budget_answers(manager):
+    user_info = {"vehicle_type": "sedan", "budget": 30000.0, "budget_category": "economy"}
+    vehicles = []
+    assert manager.process_state("confirm_budget", "hmm", user_info, vehicles)[1] == "confirm_budget"
+    assert manager.process_state("confirm_budget", "yes please", user_info, vehicles)[1] == "show_vehicles"
+    assert [v["name"] for v in vehicles] == ["Toyota Camry", "Honda Accord"]
+
+    reply, state = manager.process_state("confirm_budget", "make it 45k", user_info, vehicles)
+    assert state == "confirm_budget" and "$45,000" in reply and user_info["budget_category"] == "luxury"
+    assert manager.process_state("confirm_budget", "no thanks", user_info, vehicles)[1] == "get_budget"
+    assert "budget" not in user_info
+
+
+def test_unhandled_states_stay_put(manager):
+    assert manager.process_state("get_budget", "show me some options", {}, [])[1] == "get_budget"
@@ -1,10 +1,28 @@
 import re
 from difflib import get_close_matches
 from typing import Optional, Dict, List, Any
+from utils.matcher import IntentMatcher, MessageMatch, MATCHER
+
+# Answers to a yes/no question; a "no" anywhere wins ("no thanks, not yet")
+_YES = frozenset({"yes", "yeah", "yep", "sure", "ok", "okay", "please", "definitely", "absolutely"})
+_NO = frozenset({"no", "nope", "nah"})
+
 
 class ConversationManager:
-    def __init__(self, inventory):
+    # States whose reply is fully produced by process_state
+    SCRIPTED_STATES = frozenset({"greeting", "get_intent", "get_vehicle_type", "confirm_budget"})
+
+    def __init__(self, inventory, matcher: IntentMatcher = MATCHER):
         self.inventory = inventory
+        self.matcher = matcher
+
+    def is_scripted(self, conversation_data: dict) -> bool:
+        """True if process_state alone can answer this turn. A greeting only
+        counts on the opening turn; later in a conversation it needs context."""
+        state = conversation_data.get("state", "greeting")
+        if state == "greeting":
+            return not conversation_data.get("last_response") and not conversation_data.get("turn", 0)
+        return state in self.SCRIPTED_STATES
 
     @staticmethod
     def determine_budget_category(budget_str: str) -> str:
@@ -32,25 +50,72 @@ class ConversationManager:
             return vehicle_names[match_index]
         return None
 
+    @staticmethod
+    def remember_hints(match: MessageMatch, user_info: dict):
+        """Keep details the customer volunteered ahead of the question that asks for them."""
+        if match.vehicle_type and "vehicle_type" not in user_info:
+            user_info["vehicle_type"] = match.vehicle_type
+        if match.budget and "budget" not in user_info:
+            user_info["budget"] = match.budget
+            user_info["budget_category"] = ConversationManager.determine_budget_category(str(match.budget))
+
+    @staticmethod
+    def ask_budget(user_info: dict) -> tuple:
+        """Ask for the budget, or confirm one the customer already gave."""
+        if isinstance(user_info.get("budget"), (int, float)):
+            return f"Great choice! I've noted a budget of about ${user_info['budget']:,.0f}. " \
+                   "Shall I show you what we have in that range?", "confirm_budget"
+        return "Great choice! What's your budget range?", "get_budget"
+
+    def show_vehicles(self, user_info: dict, vehicles: list) -> tuple:
+        """List the lot for the customer's vehicle type and budget category."""
+        vehicles[:] = sorted(
+            self.inventory.get_vehicles(user_info.get("vehicle_type", ""), user_info.get("budget_category", "")),
+            key=lambda vehicle: vehicle.get("price", 0)
+        )
+        if not vehicles:
+            return "I don't have a match on the lot in that range right now. " \
+                   "Would a different budget or vehicle type work for you?", "show_vehicles"
+        listed = ", ".join(f"{v['name']} (${v.get('price', 0):,})" for v in vehicles)
+        return f"Here's what we have: {listed}. Would you like details on any of them?", "show_vehicles"
+
     def process_state(self, state: str, message: str, user_info: dict, vehicles: list) -> tuple:
         if state == "greeting":
             return "Hello! Are you looking to buy or lease a car today?", "get_intent"
 
-        elif state == "get_intent":
-            if "buy" in message.lower() or "lease" in message.lower():
-                user_info["purchase_type"] = "buy" if "buy" in message.lower() else "lease"
+        match = self.matcher.match(message)
+        if state == "get_intent":
+            if match.intent:
+                user_info["purchase_type"] = match.intent
+                self.remember_hints(match, user_info)
+                if "vehicle_type" in user_info:
+                    # "I'd like to lease a crossover" answers the next question too
+                    return self.ask_budget(user_info)
                 return "What type of vehicle are you interested in? (e.g., Sedan, SUV, Truck, or Van)", "get_vehicle_type"
             return "Please specify if you want to buy or lease a vehicle.", state
 
         elif state == "get_vehicle_type":
-            vehicle_type = next(
-                (vtype for vtype in ["sedan", "suv", "truck", "van"] if vtype in message.lower()),
-                None
-            )
-            if vehicle_type:
-                user_info["vehicle_type"] = vehicle_type
-                return f"Great choice! What's your budget range?", "get_budget"
+            if match.vehicle_type:
+                user_info["vehicle_type"] = match.vehicle_type
+                self.remember_hints(match, user_info)
+                return self.ask_budget(user_info)
             return "Please specify the type of vehicle (Sedan, SUV, Truck, or Van).", state
 
-        # Add other state handling logic here
-        return "I'm not sure how to proceed. Can you clarify?", "greeting"
+        elif state == "confirm_budget":
+            if match.budget:
+                # "make it 25k" replaces the amount being confirmed
+                user_info["budget"] = match.budget
+                user_info["budget_category"] = self.determine_budget_category(str(match.budget))
+                return self.ask_budget(user_info)
+            words = set(re.findall(r"[a-z]+", message.lower()))
+            if words & _NO:
+                user_info.pop("budget", None)
+                user_info.pop("budget_category", None)
+                return "No problem. What budget range should I use instead?", "get_budget"
+            if words & _YES:
+                return self.show_vehicles(user_info, vehicles)
+            return self.ask_budget(user_info)
+
+        # Add other state handling logic here. Until then the model answers
+        # with the full context, so stay put rather than restart the script.
+        return "I'm not sure how to proceed. Can you clarify?", state
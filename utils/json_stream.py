@@ -0,0 +1,180 @@
+import re
+import json
+import typing
+from dataclasses import fields
+from typing import Any, Dict, Optional
+
+_JSON_TYPES = {str: "string", bool: "boolean", int: "integer", float: "number"}
+
+# Outcome counters for structured extraction: clean parse, repaired, partial
+# (some fields streamed before the output broke) and failed.
+PARSE_STATS = {"clean": 0, "repaired": 0, "partial": 0, "failed": 0}
+
+
+def record_parse(outcome: str):
+    PARSE_STATS[outcome] += 1
+
+
+def parse_failure_rate() -> float:
+    total = sum(PARSE_STATS.values())
+    return PARSE_STATS["failed"] / total if total else 0.0
+
+
+def dataclass_json_schema(cls) -> Dict[str, Any]:
+    """JSON schema for a flat dataclass of Optional scalar fields."""
+    hints = typing.get_type_hints(cls)
+    properties = {}
+    for field in fields(cls):
+        args = [arg for arg in typing.get_args(hints[field.name]) if arg is not type(None)] or [hints[field.name]]
+        properties[field.name] = {"type": [_JSON_TYPES.get(args[0], "string"), "null"]}
+    return {"type": "object", "properties": properties, "additionalProperties": False}
+
+
+class IncrementalJSONParser:
+    """Parses a streamed JSON object, emitting each top-level field as soon as
+    its value is complete. Text before the opening brace is ignored; fields
+    that are not valid JSON are skipped and counted in `failed_segments`."""
+
+    def __init__(self):
+        self.buffer = ""
+        self.fields: Dict[str, Any] = {}
+        self.complete = False
+        self.failed_segments = 0
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._segment_start: Optional[int] = None
+
+    def feed(self, chunk: str) -> Dict[str, Any]:
+        new_fields = {}
+        if self.complete:
+            return new_fields
+        self.buffer += chunk
+        while self._pos < len(self.buffer):
+            char = self.buffer[self._pos]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+                if self._depth == 1:
+                    self._segment_start = self._pos + 1
+            elif char in "}]" and self._depth:
+                self._depth -= 1
+                if self._depth == 0:
+                    new_fields.update(self._close_segment())
+                    self.complete = True
+                    self._pos += 1
+                    break
+            elif char == "," and self._depth == 1:
+                new_fields.update(self._close_segment())
+                self._segment_start = self._pos + 1
+            self._pos += 1
+        self.fields.update(new_fields)
+        return new_fields
+
+    def _close_segment(self) -> Dict[str, Any]:
+        if self._segment_start is None:
+            return {}
+        segment = self.buffer[self._segment_start:self._pos].strip()
+        if not segment:
+            return {}
+        try:
+            return json.loads("{" + segment + "}")
+        except json.JSONDecodeError:
+            self.failed_segments += 1
+            return {}
+
+
+_LITERALS = {"True": "true", "False": "false", "None": "null"}
+
+
+def repair_json(text: str) -> Optional[Dict[str, Any]]:
+    """Best-effort fix-up of near-JSON model output: markdown fences, prose
+    around the object, single quotes, Python literals, trailing commas and
+    truncated output. A top-level field cut off inside a string is dropped
+    rather than guessed at. Returns None if the result still does not parse."""
+    start = text.find("{")
+    if start == -1:
+        return None
+    text = text[start:]
+    end = text.rfind("}")
+    if end != -1:
+        text = text[:end + 1]
+
+    out = []
+    stack = []
+    quote = None
+    field_start = None  # where the top-level field being read begins in `out`
+    i = 0
+    while i < len(text):
+        char = text[i]
+        if quote:
+            if char == "\\" and i + 1 < len(text):
+                # \' is valid inside single-quoted strings but not in JSON
+                out.append("'" if text[i + 1] == "'" else text[i:i + 2])
+                i += 2
+                continue
+            if char == quote:
+                quote = None
+                out.append('"')
+            elif char == '"':
+                out.append('\\"')
+            else:
+                out.append(char)
+        elif char in "\"'":
+            quote = char
+            out.append('"')
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+            out.append(char)
+            if len(stack) == 1:
+                field_start = len(out)
+        elif char == "," and len(stack) == 1:
+            field_start = len(out)
+            out.append(char)
+        elif char in "}]":
+            _strip_trailing_comma(out)
+            if stack:
+                stack.pop()
+            out.append(char)
+        else:
+            word = re.match(r"[A-Za-z]+", text[i:])
+            if word:
+                out.append(_LITERALS.get(word.group(), word.group()))
+                i += len(word.group())
+                continue
+            out.append(char)
+        i += 1
+
+    # Close whatever a truncated response left open; a half-received
+    # string ("email": "j@x) is not a value worth keeping
+    if quote and field_start is not None:
+        del out[field_start:]
+        stack = stack[:1]
+    elif quote:
+        out.append('"')
+    _strip_trailing_comma(out)
+    if out and out[-1].rstrip().endswith(":"):
+        out.append("null")
+    out.extend(reversed(stack))
+
+    try:
+        repaired = json.loads("".join(out))
+    except json.JSONDecodeError:
+        return None
+    return repaired if isinstance(repaired, dict) else None
+
+
+def _strip_trailing_comma(out):
+    while out and out[-1].isspace():
+        out.pop()
+    if out and out[-1] == ",":
+        out.pop()
@@ -0,0 +1,116 @@
+"""Queue-backed JSON-lines logging that never blocks the request path.
+
+Records are filtered, sampled and tagged with the session/turn correlation id
+on the calling thread, then handed to a bounded queue. A background listener
+thread formats and writes them. When the queue is full a record is dropped
+and counted rather than blocking the caller.
+"""
+import sys
+import json
+import time
+import random
+import logging
+import contextlib
+import contextvars
+from logging.handlers import QueueHandler, QueueListener
+from queue import Queue, Full
+from typing import Dict, Iterator, Optional
+
+LOG_STATS = {"dropped": 0, "sampled_out": 0}
+
+_correlation: contextvars.ContextVar = contextvars.ContextVar("log_correlation", default=(None, None))
+
+
+@contextlib.contextmanager
+def bind_correlation(session_id: Optional[str], turn: Optional[int] = None) -> Iterator[None]:
+    """Tag every record logged in this context with the session and turn."""
+    token = _correlation.set((session_id, turn))
+    try:
+        yield
+    finally:
+        _correlation.reset(token)
+
+
+class CorrelationFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.session, record.turn = _correlation.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps a fraction of records per level and per logger-name prefix.
+    Levels and loggers without a configured rate are always kept."""
+
+    def __init__(self, level_rates: Dict[str, float], logger_rates: Dict[str, float]):
+        super().__init__()
+        self.level_rates = {logging.getLevelName(level): rate for level, rate in level_rates.items()}
+        self.logger_rates = logger_rates
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        rate = self.level_rates.get(record.levelno, 1.0)
+        for prefix, logger_rate in self.logger_rates.items():
+            if record.name.startswith(prefix):
+                rate = min(rate, logger_rate)
+        if rate >= 1.0 or random.random() < rate:
+            return True
+        LOG_STATS["sampled_out"] += 1
+        return False
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except Full:
+            LOG_STATS["dropped"] += 1
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve the message and traceback here so the record is safe to hand
+        # to another thread, but leave JSON formatting to the listener.
+        record.message = record.getMessage()
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg, record.args, record.exc_info = record.message, None, None
+        return record
+
+
+class DrainingQueueListener(QueueListener):
+    def enqueue_sentinel(self):
+        # Shutdown waits for room in a full queue instead of raising
+        self.queue.put(self._sentinel)
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage()
+        }
+        session, turn = getattr(record, "session", None), getattr(record, "turn", None)
+        if session is not None:
+            entry["cid"] = f"{session}:{turn}" if turn is not None else session
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def start_pipeline(level: int, queue_size: int, level_rates: Dict[str, float],
+                   logger_rates: Dict[str, float], stream=None) -> DrainingQueueListener:
+    """Route the root logger through a bounded queue to a JSON writer thread."""
+    log_queue: Queue = Queue(maxsize=queue_size)
+    handler = NonBlockingQueueHandler(log_queue)
+    handler.addFilter(SamplingFilter(level_rates, logger_rates))
+    handler.addFilter(CorrelationFilter())
+
+    writer = logging.StreamHandler(stream or sys.stdout)
+    writer.setFormatter(JSONFormatter())
+
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(level)
+
+    listener = DrainingQueueListener(log_queue, writer, respect_handler_level=False)
+    listener.start()
+    return listener
@@ -0,0 +1,179 @@
+import re
+from collections import deque
+from functools import lru_cache
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+# Canonical value -> phrases that mean it. Within a category, earlier values
+# win when a message mentions several ("buy or lease" is a purchase).
+SYNONYMS = {
+    "intent": {
+        "buy": ["buy", "buying", "buys", "purchase", "purchasing", "finance", "financing", "pay cash", "own one"],
+        "lease": ["lease", "leasing", "leased", "leases"],
+    },
+    "vehicle_type": {
+        "sedan": ["sedan", "sedans", "saloon", "four door", "4 door"],
+        "suv": ["suv", "suvs", "crossover", "crossovers", "sport utility", "4x4"],
+        "truck": ["truck", "trucks", "pickup", "pickups", "pick up", "pick-up"],
+        "van": ["van", "vans", "minivan", "minivans", "mini van", "people mover"],
+    },
+}
+
+# Everyday words one edit away from a synonym (keeping its first letter); never "corrected"
+NOT_TYPOS = frozenset({
+    "please", "least", "leave", "leaves", "leaving", "leaned", "leaped", "lead", "leads", "release",
+    "busy", "bury", "track", "trick", "trunk", "stuck", "salon", "vain", "vane", "vast", "mind", "mint",
+})
+
+# Words in the message, plus money amounts like $30,000, 30k or 30 thousand
+_TOKEN = re.compile(r"(\$)?(\d[\d,]*(?:\.\d+)?)\s*(k\b|thousand\b)?|[a-z0-9]+(?:-[a-z]+)*")
+
+
+def _token(m: re.Match) -> str:
+    """The automaton token for a _TOKEN match: the bare number for amounts, else the word."""
+    return m.group(2) if m.group(2) is not None else m.group(0)
+
+
+@dataclass(frozen=True)
+class MessageMatch:
+    intent: Optional[str] = None
+    vehicle_type: Optional[str] = None
+    budget: Optional[float] = None  # largest amount mentioned
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal string alignment distance (adjacent swaps count as one edit), capped at limit + 1."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class IntentMatcher:
+    """Compiled matcher for purchase intent, vehicle type and budget hints.
+
+    The synonym table is compiled once into a token-level Aho-Corasick
+    automaton, so multi-word phrases ("pick up", "sport utility") and single
+    words are found in one left-to-right pass over the message. Words that are
+    not in the vocabulary are corrected to a synonym within `max_edits` edits
+    through a deletion-neighbourhood index. Corrections keep the first letter,
+    which typos rarely change but everyday words ("struck", "guys") do.
+    """
+
+    def __init__(self, synonyms: Dict[str, Dict[str, List[str]]] = SYNONYMS, max_edits: int = 1,
+                 min_fuzzy_length: int = 4):
+        self.max_edits = max_edits
+        self.min_fuzzy_length = min_fuzzy_length
+        self.priority: Dict[Tuple[str, str], int] = {}
+        self.vocabulary = set()
+
+        # Trie over tokens: goto[node][token] -> node, output[node] -> [(category, value)]
+        self._goto: List[Dict[str, int]] = [{}]
+        self._output: List[List[Tuple[str, str]]] = [[]]
+        for category, values in synonyms.items():
+            for rank, (value, phrases) in enumerate(values.items()):
+                self.priority[(category, value)] = rank
+                for phrase in phrases:
+                    tokens = [_token(m) for m in _TOKEN.finditer(phrase.lower())]
+                    self.vocabulary.update(tokens)
+                    self._add(tokens, (category, value))
+        self._fail = self._link()
+
+        # Conversation vocabulary is small and repetitive; look each word up once
+        self.correct = lru_cache(maxsize=10000)(self.correct)
+
+        # Every vocabulary word and its deletions up to max_edits -> the words they came from
+        self._deletes: Dict[str, set] = {}
+        for word in self.vocabulary:
+            if len(word) >= self.min_fuzzy_length - self.max_edits:
+                for variant in self._deletions(word):
+                    self._deletes.setdefault(variant, set()).add(word)
+
+    def _add(self, tokens: List[str], output: Tuple[str, str]):
+        node = 0
+        for token in tokens:
+            if token not in self._goto[node]:
+                self._goto.append({})
+                self._output.append([])
+                self._goto[node][token] = len(self._goto) - 1
+            node = self._goto[node][token]
+        self._output[node].append(output)
+
+    def _link(self) -> List[int]:
+        fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for token, child in self._goto[node].items():
+                queue.append(child)
+                state = fail[node]
+                while state and token not in self._goto[state]:
+                    state = fail[state]
+                fail[child] = self._goto[state].get(token, 0)
+                self._output[child] = self._output[child] + self._output[fail[child]]
+        return fail
+
+    def _deletions(self, word: str) -> set:
+        variants, frontier = {word}, {word}
+        for _ in range(self.max_edits):
+            frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+            variants |= frontier
+        return variants
+
+    def correct(self, token: str) -> str:
+        """Map a token to the closest vocabulary word within max_edits, if it is unambiguous."""
+        if token in self.vocabulary or len(token) < self.min_fuzzy_length or token in NOT_TYPOS:
+            return token
+        candidates = set()
+        for variant in self._deletions(token):
+            candidates |= self._deletes.get(variant, set())
+        if not candidates:
+            return token
+        scored = sorted((edit_distance(token, word, self.max_edits), word) for word in candidates if word[0] == token[0])
+        if not scored:
+            return token
+        best = [word for distance, word in scored if distance == scored[0][0] <= self.max_edits]
+        return best[0] if len(best) == 1 else token
+
+    def match(self, message: str) -> MessageMatch:
+        found: Dict[str, Tuple[int, str]] = {}
+        budget = None
+        node = 0
+        for m in _TOKEN.finditer(message.lower()):
+            dollar, amount, unit = m.groups()
+            if amount is not None:
+                value = float(amount.replace(",", "")) * (1000 if unit else 1)
+                # Bare four-digit numbers in this range are model years, not prices
+                if (dollar or unit or not 1900 <= value <= 2099) and value >= 1000:
+                    budget = max(budget or 0.0, value)
+                token = _token(m)
+            else:
+                token = self.correct(_token(m))
+
+            while node and token not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(token, 0)
+            for category, value in self._output[node]:
+                rank = self.priority[(category, value)]
+                if category not in found or rank < found[category][0]:
+                    found[category] = (rank, value)
+
+        return MessageMatch(
+            intent=found.get("intent", (None, None))[1],
+            vehicle_type=found.get("vehicle_type", (None, None))[1],
+            budget=budget
+        )
+
+
+# Compiled once and shared by every ConversationManager
+MATCHER = IntentMatcher()
@@ -0,0 +1,198 @@
+"""Opt-in recorder for production conversation turns.
+
+Each turn is appended to a JSON-lines log with its input message, state before
+and after, the prompts sent to each model with their outputs and timings, and
+per-stage timings. PII is replaced by a keyed hash (HMAC-SHA256 with the
+recorder's secret salt) before anything reaches disk: known PII fields (email,
+phone, names, zip) anywhere in recorded state, and email addresses or phone
+numbers found in free text. Scrubbing and writing happen on a background
+thread; turns are never held up by disk I/O. `benchmarks/replay.py` feeds these logs back
+through the pipeline against a stub model.
+"""
+import re
+import json
+import time
+import hmac
+import queue
+import hashlib
+import logging
+import threading
+import contextlib
+import contextvars
+from typing import Any, Dict, Iterator, Optional
+
+PII_FIELDS = frozenset({"email", "phone", "first_name", "last_name", "name", "zip"})
+_EMAIL = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+# Not inside a longer word or number, e.g. the hex digest of an earlier hash
+_PHONE = re.compile(r"(?<![\w+])(?:\+?1[\s.-]?)?\(?\b\d{3}\)?[\s.-]?\d{3}[\s.-]?\d{4}\b")
+
+_current_trace: contextvars.ContextVar = contextvars.ContextVar("current_trace", default=None)
+
+
+def _snapshot(state: Dict[str, Any]) -> Dict[str, Any]:
+    # Records are serialized later on the writer thread; callers keep mutating their dicts
+    return json.loads(json.dumps(state, default=str))
+
+
+def current_trace() -> "Optional[TurnTrace]":
+    """The trace for the turn being processed in this context, if recording."""
+    return _current_trace.get()
+
+
+def clear_trace():
+    """Stop attributing model calls in this context to the current turn, e.g. in
+    a background task that outlives it."""
+    _current_trace.set(None)
+
+
+class TurnTrace:
+    def __init__(self, pipeline: str, session_id: str, turn: int, message: str, state: Dict[str, Any]):
+        self.started = time.perf_counter()
+        self.record = {
+            "v": 1,
+            "ts": time.time(),
+            "pipeline": pipeline,
+            "session": session_id,
+            "turn": turn,
+            "message": message,
+            "state_in": state,
+            "stages": {},
+            "calls": []
+        }
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            stages = self.record["stages"]
+            stages[name] = stages.get(name, 0.0) + time.perf_counter() - started
+
+    def annotate(self, key: str, value: Any):
+        self.record[key] = value
+
+    def model_call(self, task: str, prompt: str, output: str, seconds: float):
+        self.record["calls"].append({"task": task, "prompt": prompt, "output": output, "seconds": seconds})
+
+    def finish(self, reply: str, state: Dict[str, Any]):
+        self.record["reply"] = reply
+        self.record["state_out"] = _snapshot(state)
+
+
+class _NullTrace:
+    """Stands in for TurnTrace when recording is off."""
+
+    def stage(self, name: str):
+        return contextlib.nullcontext()
+
+    def annotate(self, key: str, value: Any):
+        pass
+
+    def model_call(self, task: str, prompt: str, output: str, seconds: float):
+        pass
+
+    def finish(self, reply: str, state: Dict[str, Any]):
+        pass
+
+
+NULL_TRACE = _NullTrace()
+
+
+class TurnRecorder:
+    def __init__(self, path: Optional[str], salt: str = "", max_pending: int = 1000):
+        if path and not salt:
+            # Unkeyed hashes of phone numbers or zips are trivially brute-forced
+            raise ValueError("Traffic recording needs a secret PII salt (RECORD_PII_SALT)")
+        self.path = path
+        self.salt = salt
+        self.stats = {"recorded": 0, "dropped": 0}
+        self.logger = logging.getLogger(__name__)
+        self._file = open(path, "a", encoding="utf-8") if path else None
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_pending)
+        self._thread = None
+        if self._file:
+            self._thread = threading.Thread(target=self._run, name="turn-recorder", daemon=True)
+            self._thread.start()
+
+    @property
+    def enabled(self) -> bool:
+        return self._file is not None
+
+    @contextlib.contextmanager
+    def turn(self, pipeline: str, session_id: str, turn: int, message: str,
+             state: Dict[str, Any]) -> Iterator[TurnTrace]:
+        """Record one turn; yields a no-op trace when recording is off."""
+        if not self.enabled:
+            yield NULL_TRACE
+            return
+        trace = TurnTrace(pipeline, session_id, turn, message, _snapshot(state))
+        token = _current_trace.set(trace)
+        try:
+            yield trace
+        finally:
+            _current_trace.reset(token)
+            trace.record["total"] = time.perf_counter() - trace.started
+            self._write(trace.record)
+
+    def _write(self, record: Dict[str, Any]):
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            # Recording is best-effort; never make a turn wait for the disk
+            self.stats["dropped"] += 1
+
+    def _run(self):
+        while True:
+            record = self._queue.get()
+            if record is None:
+                break
+            try:
+                self._file.write(self._serialize(record) + "\n")
+                self._file.flush()
+                self.stats["recorded"] += 1
+            except Exception as e:
+                self.logger.error(f"Failed to record turn: {e}", exc_info=True)
+
+    def _serialize(self, record: Dict[str, Any]) -> str:
+        # PII values seen in structured state are also masked wherever they
+        # appear in free text such as prompts and model output. One pass with
+        # every pattern, so no pattern sees another's hashes.
+        known = sorted(self._pii_values(record), key=len, reverse=True)
+        pattern = re.compile("|".join([*map(re.escape, known), _EMAIL.pattern, _PHONE.pattern]))
+        return json.dumps(self._scrub(record, pattern=pattern), separators=(",", ":"), default=str)
+
+    def hash_value(self, value: Any) -> str:
+        digest = hmac.new(self.salt.encode("utf-8"), str(value).encode("utf-8"), hashlib.sha256).hexdigest()
+        return f"pii:{digest[:16]}"
+
+    def _pii_values(self, value: Any, key: Optional[str] = None) -> set:
+        if key in PII_FIELDS and isinstance(value, str) and len(value.strip()) > 1 and value != "N/A":
+            return {value.strip()}
+        found = set()
+        if isinstance(value, dict):
+            for k, v in value.items():
+                found |= self._pii_values(v, k)
+        elif isinstance(value, list):
+            for v in value:
+                found |= self._pii_values(v)
+        return found
+
+    def _scrub(self, value: Any, key: Optional[str] = None, pattern=None) -> Any:
+        if key in PII_FIELDS and value not in (None, "", "N/A"):
+            return self.hash_value(value)
+        if isinstance(value, dict):
+            return {k: self._scrub(v, k, pattern) for k, v in value.items()}
+        if isinstance(value, list):
+            return [self._scrub(v, pattern=pattern) for v in value]
+        if isinstance(value, str) and pattern is not None:
+            return pattern.sub(lambda m: self.hash_value(m.group()), value)
+        return value
+
+    def close(self):
+        if self._file:
+            # Drain what is queued, then stop the writer
+            self._queue.put(None)
+            self._thread.join()
+            self._file.close()
+            self._file = None